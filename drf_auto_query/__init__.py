@@ -1 +1,4 @@
-from drf_auto_query.query_builder import prefetch_queryset_for_serializer
+from drf_auto_query.query_builder import (
+    prefetch_instances_for_serializer,
+    prefetch_queryset_for_serializer,
+)
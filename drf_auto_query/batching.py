@@ -0,0 +1,76 @@
+from itertools import islice
+from typing import List
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Prefetch, QuerySet, prefetch_related_objects
+
+from drf_auto_query.types import ModelType
+from drf_auto_query.utils import wrap_iterable_class
+
+
+class BatchedPrefetch(Prefetch):
+    """
+    Prefetch that is executed for batches of the objects it is prefetched
+    for, so the `IN` list of a single query never holds more than
+    `batch_size` keys.
+    """
+
+    def __init__(self, lookup: str, queryset: QuerySet = None, batch_size: int = None, **kwargs):
+        super().__init__(lookup, queryset=queryset, **kwargs)
+        self.batch_size = batch_size
+
+    def get_batch_size(self) -> int:
+        """
+        Return the batch size, limited to the number of query parameters that
+        the database of the prefetch queryset supports.
+        """
+
+        db = self.queryset.db if self.queryset is not None else DEFAULT_DB_ALIAS
+        max_query_params = connections[db].features.max_query_params
+        if max_query_params:
+            return min(self.batch_size, max_query_params)
+        return self.batch_size
+
+
+class _BatchedPrefetchIterableMixin:
+    """
+    Mixin for the model iterable of a queryset that executes batched
+    prefetches while the objects are fetched. Objects are yielded one chunk at
+    a time, so the prefetched objects of a chunk are merged before the next
+    chunk is fetched.
+    """
+
+    batched_prefetches: List[BatchedPrefetch]
+
+    def __iter__(self):
+        objects = super().__iter__()  # noqa
+        chunk_size = max(prefetch.get_batch_size() for prefetch in self.batched_prefetches)
+        while True:
+            chunk = list(islice(objects, chunk_size))
+            if not chunk:
+                return
+
+            for prefetch in self.batched_prefetches:
+                prefetch_in_batches(chunk, prefetch)
+            yield from chunk
+
+
+def prefetch_in_batches(objects: List[ModelType], prefetch: BatchedPrefetch):
+    """
+    Execute the prefetch for the objects, one batch of objects at a time.
+    """
+
+    batch_size = prefetch.get_batch_size()
+    for start in range(0, len(objects), batch_size):
+        prefetch_related_objects(objects[start : start + batch_size], prefetch)
+
+
+def batch_prefetches(queryset: QuerySet, batched_prefetches: List[BatchedPrefetch]) -> QuerySet:
+    """
+    Return a copy of the queryset that executes the batched prefetches for
+    chunks of its objects while they are fetched.
+    """
+
+    return wrap_iterable_class(
+        queryset, _BatchedPrefetchIterableMixin, batched_prefetches=batched_prefetches
+    )
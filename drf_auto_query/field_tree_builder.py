@@ -1,13 +1,56 @@
-from typing import List, Type
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+from weakref import WeakKeyDictionary
 
+from django.db.models import Q
+from rest_framework.serializers import Serializer
 from rest_framework.utils import model_meta
 
+from drf_auto_query.exceptions import QueryBuilderError
+from drf_auto_query.fields import RecursiveField
+from drf_auto_query.instrumentation import Instrumentation, get_instrumentation
 from drf_auto_query.types import ModelRelation, ModelType, SerializerField
-from drf_auto_query.utils import get_serializer_fields
+from drf_auto_query.utils import get_serializer_fields, get_serializer_meta_option
+
+if TYPE_CHECKING:
+    from drf_auto_query.plan_store import PlanStore
+    from drf_auto_query.reference_cache import ReferenceCache
 
 
 PARENT_FIELD_NODE = "--parent--"
 
+# Meta options of serializers that are part of the field tree.
+FIELD_TREE_META_OPTIONS = (
+    "prefetch_using",
+    "reference_cache",
+    "prefetch_filter",
+    "prefetch_ordering",
+    "prefetch_batch_size",
+)
+
+# Field trees of serializer classes, keyed by the serializer class and then by
+# the model of the queryset, or by the model and the fingerprint of the fields
+# for serializers that are configured with context or keyword arguments. Weak
+# keys let dynamically created serializer classes be garbage collected.
+_field_tree_cache: "WeakKeyDictionary[Type[Serializer], Dict[Hashable, FieldNode]]" = (
+    WeakKeyDictionary()
+)
+
+# Store of field trees that were built ahead of time and are loaded instead of
+# building the trees in every process.
+_plan_store: Optional["PlanStore"] = None
+
 
 class FieldNode:
     """
@@ -22,12 +65,28 @@ class FieldNode:
         serializer_field: SerializerField,
         parent_relation: ModelRelation = ModelRelation.NONE,
         model: Type[ModelType] = None,
+        using: Optional[str] = None,
+        reference_cache: Optional["ReferenceCache"] = None,
+        prefetch_filter: Optional[Union[Q, Dict[str, Any]]] = None,
+        prefetch_ordering: Optional[Sequence[Any]] = None,
+        prefetch_batch_size: Optional[int] = None,
     ):
         self.field_name = field_name
         self.source = source
         self.serializer_field = serializer_field
         self.parent_relation = parent_relation
         self.model = model
+        # Database alias the prefetch for this node should be sent to.
+        self.using = using
+        # Shared cache the related objects of this node are taken from instead
+        # of joining their table.
+        self.reference_cache = reference_cache
+        # Filter and ordering applied to the prefetch queryset of this node.
+        self.prefetch_filter = prefetch_filter
+        self.prefetch_ordering = prefetch_ordering
+        # Maximum number of objects the prefetch for this node is executed for
+        # with a single query.
+        self.prefetch_batch_size = prefetch_batch_size
 
         self.children: List[FieldNode] = []
 
@@ -36,7 +95,7 @@ class FieldNode:
     @property
     def model_meta(self):
         if self.model and self._model_meta is None:
-            self._model_meta = model_meta.get_field_info(self.model)
+            self._model_meta = get_model_field_info(self.model)
         return self._model_meta
 
     def has_relation(self, field_source: str) -> bool:
@@ -48,7 +107,16 @@ class FieldNode:
         if not self.model:
             return False
 
-        return field_source in self.model_meta.fields or field_source in self.model_meta.relations
+        return self.is_model_field(field_source) or field_source in self.model_meta.relations
+
+    def is_model_field(self, field_source: str) -> bool:
+        """
+        Returns True if the source of a serializer field is a model field that
+        does not represent a relation to another model, including the primary
+        key inherited from a parent model.
+        """
+
+        return field_source in self.model_meta.fields or field_source == self.model_meta.pk.name
 
     def __repr__(self):
         return f"<FieldNode {self.field_name}>"
@@ -57,6 +125,15 @@ class FieldNode:
     def from_field(cls, field: SerializerField, **kwargs):
         kwargs.setdefault("field_name", field.field_name)
         kwargs.setdefault("source", field.source)
+        kwargs.setdefault("using", get_serializer_meta_option(field, "prefetch_using"))
+        kwargs.setdefault("reference_cache", get_serializer_meta_option(field, "reference_cache"))
+        kwargs.setdefault("prefetch_filter", get_serializer_meta_option(field, "prefetch_filter"))
+        kwargs.setdefault(
+            "prefetch_ordering", get_serializer_meta_option(field, "prefetch_ordering")
+        )
+        kwargs.setdefault(
+            "prefetch_batch_size", get_serializer_meta_option(field, "prefetch_batch_size")
+        )
         return cls(serializer_field=field, **kwargs)
 
 
@@ -77,14 +154,18 @@ def build_serializer_field_tree(
         return field_node
 
     for field in children_fields:
-        if not model or not field_node.has_relation(field.source):
+        if (
+            not model
+            or not field_node.has_relation(field.source)
+            or (isinstance(field, RecursiveField) and field.is_exhausted)
+        ):
             # This is a serializer field that does not correspond to a model field
-            # (e.g. SerializerMethodField).
+            # (e.g. SerializerMethodField) or a recursive field past its maximum depth.
             child_node = build_serializer_field_tree(field)
             field_node.children.append(child_node)
             continue
 
-        if field.source in field_node.model_meta.fields:
+        if field_node.is_model_field(field.source):
             # Serializer field that corresponds to a model field, but does not
             # represent a relation to another model.
             child_node = build_serializer_field_tree(field, parent_relation=ModelRelation.FIELD)
@@ -92,17 +173,196 @@ def build_serializer_field_tree(
             continue
 
         relation_info = field_node.model_meta.relations[field.source]
-        parent_relation = (
-            ModelRelation.MANY_RELATED_MODEL
-            if relation_info.to_many
-            else ModelRelation.RELATED_MODEL
-        )
+        if relation_info.to_many:
+            parent_relation = ModelRelation.MANY_RELATED_MODEL
+        elif _is_parent_link(relation_info):
+            parent_relation = ModelRelation.PARENT_LINK
+        else:
+            parent_relation = ModelRelation.RELATED_MODEL
 
         child_node = build_serializer_field_tree(
             field,
             model=relation_info.related_model,
             parent_relation=parent_relation,
         )
+        if child_node.reference_cache:
+            _validate_reference_cache(child_node, relation_info)
+        if (
+            child_node.prefetch_filter is not None
+            or child_node.prefetch_ordering
+            or child_node.prefetch_batch_size
+        ) and not relation_info.to_many:
+            raise QueryBuilderError(
+                f"Prefetch filter, ordering and batch size of '{child_node.field_name}' can "
+                "only be used for to-many relations."
+            )
         field_node.children.append(child_node)
 
     return field_node
+
+
+def format_field_tree(field_node: FieldNode, depth: int = 0) -> List[str]:
+    """
+    Return a readable representation of the field tree with one line per node.
+    """
+
+    model_name = f" {field_node.model.__name__}" if field_node.model else ""
+    lines = [
+        f"{'    ' * depth}{field_node.field_name or '<root>'} "
+        f"[{field_node.parent_relation.value}{model_name}] source={field_node.source or '-'}"
+    ]
+    for child_node in field_node.children:
+        lines.extend(format_field_tree(child_node, depth + 1))
+
+    return lines
+
+
+def get_model_field_info(model: Type[ModelType]) -> model_meta.FieldInfo:
+    """
+    Return the field info of the model like `model_meta.get_field_info`, with
+    the parent links of multi-table inheritance added as forward to-one
+    relations. DRF leaves them out because they are not serialized by default.
+    """
+
+    field_info = model_meta.get_field_info(model)
+    parent_links = {
+        field.name: model_meta.RelationInfo(
+            model_field=field,
+            related_model=field.related_model,
+            to_many=False,
+            to_field=None,
+            has_through_model=False,
+            reverse=False,
+        )
+        for field in model._meta.concrete_model._meta.parents.values()  # noqa
+        if field is not None
+    }
+    if not parent_links:
+        return field_info
+
+    forward_relations = {**field_info.forward_relations, **parent_links}
+    return field_info._replace(
+        forward_relations=forward_relations,
+        relations={**field_info.relations, **parent_links},
+    )
+
+
+def _is_parent_link(relation_info: model_meta.RelationInfo) -> bool:
+    return (
+        not relation_info.reverse
+        and relation_info.model_field is not None
+        and relation_info.model_field.remote_field.parent_link
+    )
+
+
+def _validate_reference_cache(field_node: FieldNode, relation_info):
+    if relation_info.to_many or relation_info.reverse or _is_parent_link(relation_info):
+        raise QueryBuilderError(
+            f"Reference cache of '{field_node.field_name}' can only be used "
+            "for forward to-one relations."
+        )
+
+    for child_node in field_node.children:
+        if child_node.parent_relation in (
+            ModelRelation.RELATED_MODEL,
+            ModelRelation.MANY_RELATED_MODEL,
+            ModelRelation.PARENT_LINK,
+        ):
+            raise QueryBuilderError(
+                f"Objects of '{field_node.field_name}' come from a reference cache "
+                "and can not have nested relations."
+            )
+
+
+def set_plan_store(plan_store: Optional["PlanStore"]):
+    """
+    Set the plan store that field trees are loaded from before they are built.
+    Passing None disables loading the field trees.
+    """
+
+    global _plan_store
+    _plan_store = plan_store
+
+
+def get_serializer_fingerprint(serializer: SerializerField) -> Tuple:
+    """
+    Return a hashable description of the fields of a serializer instance and
+    of its nested serializers. Serializers with equal fingerprints have equal
+    field trees.
+    """
+
+    return (
+        tuple(
+            _get_hashable(get_serializer_meta_option(serializer, option))
+            for option in FIELD_TREE_META_OPTIONS
+        ),
+        tuple(
+            (field.field_name, field.source, type(field), get_serializer_fingerprint(field))
+            for field in get_serializer_fields(serializer)
+        ),
+    )
+
+
+def _get_hashable(value: Any) -> Hashable:
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _detach_serializer_fields(field_node: FieldNode):
+    """
+    Remove the serializer fields from a field tree, so a cached tree does not
+    keep the context of the serializer it was built from, e.g. a request.
+    """
+
+    field_node.serializer_field = None
+    for child_node in field_node.children:
+        _detach_serializer_fields(child_node)
+
+
+def get_serializer_field_tree(
+    serializer_class: Type[Serializer],
+    model: Type[ModelType],
+    instrumentation: Instrumentation = None,
+    context: Dict[str, Any] = None,
+    serializer_kwargs: Dict[str, Any] = None,
+) -> "FieldNode":
+    """
+    Return the field tree of a serializer class for the given model. The tree
+    is loaded from the plan store or built only once per serializer class and
+    model and then cached.
+
+    Serializers that change their fields in `__init__` are instantiated with
+    the context and keyword arguments, and their trees are cached by the
+    fingerprint of the resulting fields, so all the configurations with the
+    same fields share one tree.
+    """
+
+    instrumentation = instrumentation or get_instrumentation()
+    instrumentation.plan_build_started(serializer_class, model)
+    start = perf_counter()
+
+    model_field_trees = _field_tree_cache.setdefault(serializer_class, {})
+    if context is None and not serializer_kwargs:
+        field_tree = model_field_trees.get(model)
+        cache_hit = field_tree is not None
+        if not cache_hit:
+            if _plan_store is not None:
+                field_tree = _plan_store.get(serializer_class, model)
+            if field_tree is None:
+                field_tree = build_serializer_field_tree(serializer_class(), model)
+            model_field_trees[model] = field_tree
+    else:
+        serializer = serializer_class(context=context or {}, **(serializer_kwargs or {}))
+        cache_key = (model, get_serializer_fingerprint(serializer))
+        field_tree = model_field_trees.get(cache_key)
+        cache_hit = field_tree is not None
+        if not cache_hit:
+            field_tree = build_serializer_field_tree(serializer, model)
+            _detach_serializer_fields(field_tree)
+            model_field_trees[cache_key] = field_tree
+
+    instrumentation.plan_build_finished(serializer_class, model, perf_counter() - start, cache_hit)
+    return field_tree
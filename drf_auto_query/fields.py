@@ -0,0 +1,65 @@
+from rest_framework import serializers
+
+
+class RecursiveField(serializers.Field):
+    """
+    Read only field that serializes a relation with the serializer the field
+    is declared on, e.g. the children of a category in a category tree.
+
+    The query builder prefetches up to `max_depth` levels of the relation,
+    with one query per level, so the number of queries depends on the depth
+    of the tree and not on the number of its nodes. Levels deeper than
+    `max_depth` are not serialized.
+
+    :param max_depth: Number of levels of the relation that are serialized.
+    :param many: If True, the relation is serialized as a list.
+    """
+
+    def __init__(self, max_depth: int = 5, many: bool = False, **kwargs):
+        self.max_depth = max_depth
+        self.many = many
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    @property
+    def depth(self) -> int:
+        """
+        Level of the tree that the serializer the field is bound to serializes.
+        """
+
+        return getattr(self.parent, "_recursion_depth", 0)
+
+    @property
+    def is_exhausted(self) -> bool:
+        """
+        True if the field is at the maximum depth and is not serialized.
+        """
+
+        return self.depth >= self.max_depth
+
+    def get_serializer(self):
+        """
+        Return the serializer for the next level of the tree. It is built once
+        per serializer the field is bound to and reused for all the objects of
+        the level. The serializer is bound to the field, so its `root` is the
+        root serializer of the whole tree.
+        """
+
+        next_level = getattr(self, "_next_level", None)
+        if next_level is not None and next_level[0] is self.parent:
+            return next_level[1]
+
+        serializer = type(self.parent)(many=self.many, context=self.context)
+        base_serializer = serializer.child if self.many else serializer
+        base_serializer._recursion_depth = self.depth + 1
+        serializer.bind(field_name=self.field_name, parent=self)
+        self._next_level = (self.parent, serializer)
+        return serializer
+
+    def get_attribute(self, instance):
+        if self.is_exhausted:
+            return [] if self.many else None
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        return self.get_serializer().to_representation(value)
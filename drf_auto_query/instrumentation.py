@@ -0,0 +1,189 @@
+import logging
+from time import perf_counter
+from typing import List, Type
+
+from django.db.models import QuerySet
+from rest_framework.serializers import Serializer
+
+from drf_auto_query.types import ModelType
+from drf_auto_query.utils import wrap_iterable_class
+
+
+class Instrumentation:
+    """
+    Receiver for the events emitted while building and executing the
+    querysets for a serializer. Every hook is a no-op, so subclasses only
+    need to override the events they are interested in.
+    """
+
+    # The query builder skips wrapping the generated prefetch querysets
+    # when instrumentation is disabled.
+    enabled = True
+
+    def plan_build_started(self, serializer_class: Type[Serializer], model: Type[ModelType]):
+        pass
+
+    def plan_build_finished(
+        self,
+        serializer_class: Type[Serializer],
+        model: Type[ModelType],
+        duration: float,
+        cache_hit: bool,
+    ):
+        pass
+
+    def joins_selected(
+        self,
+        serializer_class: Type[Serializer],
+        lookup: str,
+        model: Type[ModelType],
+        joined_tables: List[str],
+    ):
+        pass
+
+    def prefetch_executed(
+        self,
+        serializer_class: Type[Serializer],
+        lookup: str,
+        model: Type[ModelType],
+        row_count: int,
+        duration: float,
+    ):
+        pass
+
+
+class NullInstrumentation(Instrumentation):
+    """
+    Default instrumentation that ignores all events.
+    """
+
+    enabled = False
+
+
+class LoggingInstrumentation(Instrumentation):
+    """
+    Instrumentation that writes every event to a `logging` logger.
+    """
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG):
+        self.logger = logger or logging.getLogger("drf_auto_query")
+        self.level = level
+
+    def plan_build_finished(self, serializer_class, model, duration, cache_hit):
+        self.logger.log(
+            self.level,
+            "Built plan for %s on %s in %.2fms (cache %s)",
+            serializer_class.__name__,
+            model._meta.label,  # noqa
+            duration * 1000,
+            "hit" if cache_hit else "miss",
+        )
+
+    def joins_selected(self, serializer_class, lookup, model, joined_tables):
+        self.logger.log(
+            self.level,
+            "%s joins %d tables on %s: %s",
+            serializer_class.__name__,
+            len(joined_tables),
+            lookup or model._meta.label,  # noqa
+            ", ".join(joined_tables),
+        )
+
+    def prefetch_executed(self, serializer_class, lookup, model, row_count, duration):
+        self.logger.log(
+            self.level,
+            "%s prefetched %d rows for %s in %.2fms",
+            serializer_class.__name__,
+            row_count,
+            lookup,
+            duration * 1000,
+        )
+
+
+class StatsdInstrumentation(Instrumentation):
+    """
+    Instrumentation that reports events to a statsd style client, i.e. any
+    object that provides `incr(name)`, `gauge(name, value)` and
+    `timing(name, milliseconds)` methods.
+    """
+
+    def __init__(self, client, prefix: str = "drf_auto_query"):
+        self.client = client
+        self.prefix = prefix
+
+    def plan_build_finished(self, serializer_class, model, duration, cache_hit):
+        name = f"{self.prefix}.plan.{serializer_class.__name__}"
+        self.client.incr(f"{name}.{'cache_hit' if cache_hit else 'cache_miss'}")
+        self.client.timing(f"{name}.build", duration * 1000)
+
+    def joins_selected(self, serializer_class, lookup, model, joined_tables):
+        name = f"{self.prefix}.joins.{serializer_class.__name__}.{lookup or 'root'}"
+        self.client.gauge(name, len(joined_tables))
+
+    def prefetch_executed(self, serializer_class, lookup, model, row_count, duration):
+        name = f"{self.prefix}.prefetch.{serializer_class.__name__}.{lookup}"
+        self.client.gauge(f"{name}.rows", row_count)
+        self.client.timing(f"{name}.duration", duration * 1000)
+
+
+_instrumentation: Instrumentation = NullInstrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Instrumentation = None):
+    """
+    Set the instrumentation that is used by default by every query builder.
+    Passing None restores the no-op default.
+    """
+
+    global _instrumentation
+    _instrumentation = instrumentation or NullInstrumentation()
+
+
+class _InstrumentedIterableMixin:
+    """
+    Mixin for the model iterable of a prefetch queryset that reports the
+    number of fetched rows and the time spent fetching them.
+    """
+
+    instrumentation: Instrumentation
+    serializer_class: Type[Serializer]
+    lookup: str
+
+    def __iter__(self):
+        row_count = 0
+        start = perf_counter()
+        for obj in super().__iter__():  # noqa
+            row_count += 1
+            yield obj
+
+        self.instrumentation.prefetch_executed(
+            self.serializer_class,
+            self.lookup,
+            self.queryset.model,  # noqa
+            row_count,
+            perf_counter() - start,
+        )
+
+
+def instrument_queryset(
+    queryset: QuerySet,
+    instrumentation: Instrumentation,
+    serializer_class: Type[Serializer],
+    lookup: str,
+) -> QuerySet:
+    """
+    Return a copy of the queryset that reports its execution to the given
+    instrumentation.
+    """
+
+    return wrap_iterable_class(
+        queryset,
+        _InstrumentedIterableMixin,
+        instrumentation=instrumentation,
+        serializer_class=serializer_class,
+        lookup=lookup,
+    )
@@ -0,0 +1,261 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+from django.db.models import Manager, QuerySet
+from rest_framework.fields import SkipField
+from rest_framework.serializers import ListSerializer, Serializer
+
+from drf_auto_query.fields import RecursiveField
+
+
+class BatchLoader:
+    """
+    Collects the keys that are needed during serialization and resolves all
+    of them with a single call to `load_batch`. Resolved keys are cached for
+    the rest of the serialization.
+    """
+
+    def __init__(self):
+        self.batch_count = 0
+        self._pending = set()
+        self._loaded = set()
+        self._results: Dict[Hashable, Any] = {}
+
+    def load_batch(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Return a dictionary mapping the given keys to their values. Keys
+        that are missing from the dictionary resolve to the default value
+        passed to `load`.
+        """
+
+        raise NotImplementedError
+
+    def register(self, key: Hashable):
+        """
+        Register a key that will be loaded with the next batch.
+        """
+
+        if key not in self._loaded:
+            self._pending.add(key)
+
+    def load(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value for the key. If the key is not loaded yet, all the
+        registered keys are loaded together with it.
+        """
+
+        if key not in self._loaded:
+            self._pending.add(key)
+            self._dispatch()
+
+        return self._results.get(key, default)
+
+    def _dispatch(self):
+        keys = list(self._pending)
+        self._pending.clear()
+
+        self._results.update(self.load_batch(keys))
+        self._loaded.update(keys)
+        self.batch_count += 1
+
+
+class ModelBatchLoader(BatchLoader):
+    """
+    Loads the objects of a queryset whose field value is one of the
+    registered keys with one query per batch.
+
+    :param queryset: Queryset the objects are loaded from.
+    :param field_name: Name of the field that is matched against the keys.
+    :param many: If True, every key resolves to a list of all the matching objects
+      instead of a single object.
+    """
+
+    def __init__(self, queryset: QuerySet, field_name: str = "pk", many: bool = False):
+        super().__init__()
+        self.queryset = queryset
+        self.field_name = field_name
+        self.many = many
+
+    def load_batch(self, keys):
+        objects = self.queryset.filter(**{f"{self.field_name}__in": keys})
+        if not self.many:
+            return {obj.serializable_value(self.field_name): obj for obj in objects}
+
+        results = defaultdict(list)
+        for obj in objects:
+            results[obj.serializable_value(self.field_name)].append(obj)
+        return results
+
+
+class BatchLoaderMixin:
+    """
+    Serializer mixin that gives method fields access to batch loaders that are
+    shared for a single serialization.
+
+    Loaders are declared in `batch_loaders`, which maps loader names to
+    loader factories. Before the first object is serialized, the
+    `register_<field_name>` method of every field is called for all the
+    objects of the serialization, so that each loader runs a single batch.
+    Registration starts at the root serializer whatever its class, so it
+    covers the serializers that use this mixin at any depth below it:
+
+        class BookSerializer(BatchLoaderMixin, serializers.ModelSerializer):
+            batch_loaders = {"sales": SalesLoader}
+            sales = serializers.SerializerMethodField()
+
+            def register_sales(self, book):
+                self.get_loader("sales").register(book.isbn)
+
+            def get_sales(self, book):
+                return self.get_loader("sales").load(book.isbn)
+    """
+
+    batch_loaders: Dict[str, Callable[[], BatchLoader]] = {}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)  # noqa
+        if type(list_serializer) is ListSerializer:
+            list_serializer.__class__ = BatchLoaderListSerializer
+        return list_serializer
+
+    def get_loader(self, name: str) -> BatchLoader:
+        """
+        Return the loader with the given name for the current serialization.
+        """
+
+        root = self.root  # noqa
+        if not hasattr(root, "_batch_loaders"):
+            root._batch_loaders = {}
+
+        loaders = root._batch_loaders
+        if name not in loaders:
+            loaders[name] = self.batch_loaders[name]()
+        return loaders[name]
+
+    def register_batch_keys(self, instances: List[Any]):
+        """
+        Register the keys that the fields need to serialize the given instances.
+        """
+
+        for field_name, field in self.fields.items():  # noqa
+            register = getattr(self, f"register_{field_name}", None)
+            if register is not None:
+                for instance in instances:
+                    register(instance)
+
+        _register_nested_batch_keys(self, instances)
+
+    def to_representation(self, instance):
+        root = self.root  # noqa
+        if not getattr(root, "_batch_keys_registered", False):
+            if root is self:
+                _register_root_batch_keys(root, [instance])
+            elif root.instance is not None:
+                _register_root_batch_keys(root, _get_root_instances(root))
+            else:
+                # The root serializer was not given its objects, e.g. when its
+                # `to_representation` is called directly, so only the keys of
+                # this object can be registered.
+                self.register_batch_keys([instance])
+        return super().to_representation(instance)  # noqa
+
+
+class BatchLoaderListSerializer(ListSerializer):
+    """
+    List serializer that registers the batch loader keys of all the objects
+    before serializing any of them.
+    """
+
+    def to_representation(self, data):
+        if self.parent is not None or getattr(self, "_batch_keys_registered", False):
+            return super().to_representation(data)
+
+        iterable = data.all() if isinstance(data, Manager) else data
+        instances = list(iterable)
+        _register_root_batch_keys(self, instances)
+        return super().to_representation(instances)
+
+
+def _register_root_batch_keys(root: Serializer, instances: List[Any]):
+    """
+    Register the batch loader keys of all the serializers of a serialization
+    once, starting at its root serializer.
+    """
+
+    root._batch_keys_registered = True
+    serializer = root.child if isinstance(root, ListSerializer) else root
+    if isinstance(serializer, BatchLoaderMixin):
+        serializer.register_batch_keys(instances)
+    else:
+        _register_nested_batch_keys(serializer, instances)
+
+
+def _get_root_instances(root: Serializer) -> List[Any]:
+    if not isinstance(root, ListSerializer):
+        return [root.instance]
+
+    # Querysets cache their results, so the list serializer does not fetch
+    # the objects again.
+    return list(root.instance.all() if isinstance(root.instance, Manager) else root.instance)
+
+
+def _register_nested_batch_keys(serializer: Serializer, instances: List[Any]):
+    """
+    Register the batch loader keys of all the nested serializers that use
+    batch loaders, with the related objects of the given instances.
+    """
+
+    for field in serializer.fields.values():
+        nested_serializer = _get_nested_serializer(field)
+        if not _uses_batch_loaders(nested_serializer):
+            continue
+
+        nested_instances = _get_nested_instances(field, instances)
+        if isinstance(nested_serializer, BatchLoaderMixin):
+            nested_serializer.register_batch_keys(nested_instances)
+        else:
+            _register_nested_batch_keys(nested_serializer, nested_instances)
+
+
+def _uses_batch_loaders(field) -> bool:
+    if isinstance(field, BatchLoaderMixin):
+        return True
+    if not isinstance(field, Serializer):
+        return False
+
+    return any(
+        _uses_batch_loaders(_get_nested_serializer(nested)) for nested in field.fields.values()
+    )
+
+
+def _get_nested_serializer(field):
+    """
+    Return the serializer that serializes the objects of a field, which is the
+    next level of the tree for recursive fields.
+    """
+
+    if isinstance(field, RecursiveField):
+        if field.is_exhausted:
+            return None
+        field = field.get_serializer()
+
+    return field.child if isinstance(field, ListSerializer) else field
+
+
+def _get_nested_instances(field, instances: Iterable[Any]) -> List[Any]:
+    nested_instances = []
+    for instance in instances:
+        try:
+            value = field.get_attribute(instance)
+        except SkipField:
+            continue
+
+        if value is None:
+            continue
+        if isinstance(field, ListSerializer) or (isinstance(field, RecursiveField) and field.many):
+            nested_instances.extend(value.all() if isinstance(value, Manager) else value)
+        else:
+            nested_instances.append(value)
+
+    return nested_instances
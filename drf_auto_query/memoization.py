@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class RepresentationMemo:
+    """
+    Bounded store of the representations of objects that were already
+    serialized during a single serialization. The least recently used
+    representations are evicted first.
+
+    :param max_size: Maximum number of representations that are kept.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._representations: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._representations)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the representation stored for the key, or None if there is none.
+        """
+
+        representation = self._representations.get(key)
+        if representation is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._representations.move_to_end(key)
+        return representation
+
+    def set(self, key: Hashable, representation: Any):
+        self._representations[key] = representation
+        self._representations.move_to_end(key)
+        while len(self._representations) > self.max_size:
+            self._representations.popitem(last=False)
+
+
+class MemoizedRepresentationMixin:
+    """
+    Serializer mixin that marks a nested serializer as pure, i.e. its
+    representation of an object depends only on the object. Objects that
+    appear several times in one serialization, e.g. the publisher of
+    thousands of books, are serialized once and their representation is
+    reused.
+
+    Representations are memoized by serializer class, model and primary key
+    for the duration of the serialization of the root serializer, and are
+    shared between all the places the object appears in, so they must be
+    treated as read-only.
+    """
+
+    # Maximum number of representations of this serializer class that are
+    # kept for a single serialization.
+    memoize_max_size: int = 1000
+
+    def get_representation_memo(self) -> RepresentationMemo:
+        """
+        Return the memo of this serializer class for the current serialization.
+        """
+
+        root = self.root  # noqa
+        if not hasattr(root, "_representation_memos"):
+            root._representation_memos = {}
+
+        memos = root._representation_memos
+        if type(self) not in memos:
+            memos[type(self)] = RepresentationMemo(max_size=self.memoize_max_size)
+        return memos[type(self)]
+
+    def to_representation(self, instance):
+        pk = getattr(instance, "pk", None)
+        if pk is None:
+            return super().to_representation(instance)  # noqa
+
+        # Memos are kept per serializer class, so the model and the primary
+        # key identify the representation. Levels of a recursive field are
+        # serialized by the same class and cut off at different depths.
+        memo = self.get_representation_memo()
+        key = (type(instance), pk, getattr(self, "_recursion_depth", 0))
+        representation = memo.get(key)
+        if representation is None:
+            representation = super().to_representation(instance)  # noqa
+            memo.set(key, representation)
+        return representation
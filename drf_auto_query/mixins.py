@@ -8,5 +8,10 @@ class AutoQuerySetMixin:
     serializer.
     """
 
-    def prefetch_for(self, serializer_class):
-        return prefetch_queryset_for_serializer(self, serializer_class)
+    def prefetch_for(self, serializer_class, **kwargs):
+        """
+        Prefetch the related objects for the serializer class. Keyword arguments
+        are passed to `prefetch_queryset_for_serializer`.
+        """
+
+        return prefetch_queryset_for_serializer(self, serializer_class, **kwargs)
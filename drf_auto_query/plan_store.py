@@ -0,0 +1,256 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+
+from django.apps import apps
+from rest_framework.serializers import ListSerializer, Serializer
+
+from drf_auto_query.field_tree_builder import (
+    FIELD_TREE_META_OPTIONS,
+    FieldNode,
+    build_serializer_field_tree,
+    set_plan_store,  # noqa
+)
+from drf_auto_query.types import ModelRelation, ModelType
+
+
+logger = logging.getLogger("drf_auto_query")
+
+# Bumped whenever the format of the stored field trees changes. Files with a
+# different version are ignored.
+PLAN_FORMAT_VERSION = 3
+
+
+SerializerPlan = Union[Type[Serializer], Tuple[Type[Serializer], Type[ModelType]]]
+
+
+class PlanStore:
+    """
+    File with field trees of serializers that are built ahead of time, e.g.
+    at deploy time, and loaded lazily by every worker process instead of
+    building the trees again.
+
+    Plans are keyed by the import path of the serializer class and the label
+    of the model. Each plan carries a hash of the declared serializer fields
+    and of the fields of all the models in the plan, so plans that went stale
+    since the file was written are detected and built again.
+
+    Plans of serializers that declare options which can not be stored, such
+    as reference caches or prefetch filters, are not written to the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._plans: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def write(self, serializer_plans: Iterable[SerializerPlan]):
+        """
+        Build the field trees of the serializers and write them to the file.
+
+        :param serializer_plans: Serializer classes with a `Meta.model`, or tuples of a
+          serializer class and the model of the queryset it is used with.
+        """
+
+        plans = {}
+        for serializer_plan in serializer_plans:
+            serializer_class, model = _get_serializer_and_model(serializer_plan)
+            tree = _dump_field_node(build_serializer_field_tree(serializer_class(), model))
+            if tree is None:
+                continue
+
+            plans[_get_plan_key(serializer_class, model)] = {
+                "schema_hash": _get_schema_hash(serializer_class, _get_tree_models(tree)),
+                "tree": tree,
+            }
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as plan_file:
+            json.dump(
+                {"version": PLAN_FORMAT_VERSION, "plans": plans},
+                plan_file,
+                separators=(",", ":"),
+            )
+            # Temporary files are only readable by their owner, but the workers
+            # that read the plans may run as another user.
+            os.fchmod(plan_file.fileno(), 0o644)
+        os.replace(plan_file.name, self.path)
+
+        with self._lock:
+            self._plans = None
+
+    def get(
+        self, serializer_class: Type[Serializer], model: Type[ModelType]
+    ) -> Optional[FieldNode]:
+        """
+        Return the stored field tree of the serializer class for the model, or
+        None if the file has no plan for them or the plan is stale.
+        """
+
+        plan = self._get_plans().get(_get_plan_key(serializer_class, model))
+        if plan is None:
+            return None
+
+        try:
+            models = _get_tree_models(plan["tree"])
+            if plan["schema_hash"] != _get_schema_hash(serializer_class, models):
+                return None
+            return _load_field_node(plan["tree"])
+        except LookupError:
+            # One of the models of the plan does not exist anymore.
+            return None
+
+    def _get_plans(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._plans is None:
+                self._plans = self._read_plans()
+            return self._plans
+
+    def _read_plans(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as plan_file:
+                content = json.load(plan_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as error:
+            logger.warning(
+                "Plan file %s can not be read, plans are built instead: %s", self.path, error
+            )
+            return {}
+
+        if content.get("version") != PLAN_FORMAT_VERSION:
+            logger.warning(
+                "Plan file %s has version %s instead of %s, plans are built instead.",
+                self.path,
+                content.get("version"),
+                PLAN_FORMAT_VERSION,
+            )
+            return {}
+        return content.get("plans", {})
+
+
+def _get_serializer_and_model(
+    serializer_plan: SerializerPlan,
+) -> Tuple[Type[Serializer], Type[ModelType]]:
+    if isinstance(serializer_plan, tuple):
+        return serializer_plan
+
+    return serializer_plan, serializer_plan.Meta.model
+
+
+def _get_plan_key(serializer_class: Type[Serializer], model: Type[ModelType]) -> str:
+    return (
+        f"{serializer_class.__module__}.{serializer_class.__qualname__}"
+        f"|{model._meta.label}"  # noqa
+    )
+
+
+def _dump_field_node(field_node: FieldNode) -> Optional[List[Any]]:
+    """
+    Return a compact representation of the field tree, or None if the tree has
+    options that can not be stored.
+    """
+
+    if (
+        field_node.reference_cache is not None
+        or field_node.prefetch_filter is not None
+        or field_node.prefetch_ordering
+    ):
+        return None
+
+    children = []
+    for child_node in field_node.children:
+        child = _dump_field_node(child_node)
+        if child is None:
+            return None
+        children.append(child)
+
+    return [
+        field_node.field_name,
+        field_node.source,
+        field_node.parent_relation.value,
+        field_node.model._meta.label if field_node.model else None,  # noqa
+        field_node.using,
+        field_node.prefetch_batch_size,
+        children,
+    ]
+
+
+def _load_field_node(data: List[Any]) -> FieldNode:
+    field_name, source, parent_relation, model_label, using, prefetch_batch_size, children = data
+    field_node = FieldNode(
+        field_name=field_name,
+        source=source,
+        serializer_field=None,
+        parent_relation=ModelRelation(parent_relation),
+        model=apps.get_model(model_label) if model_label else None,
+        using=using,
+        prefetch_batch_size=prefetch_batch_size,
+    )
+    field_node.children = [_load_field_node(child) for child in children]
+    return field_node
+
+
+def _get_tree_models(data: List[Any]) -> Set[str]:
+    model_label, children = data[3], data[-1]
+    models = {model_label} if model_label else set()
+    for child in children:
+        models |= _get_tree_models(child)
+    return models
+
+
+def _get_schema_hash(serializer_class: Type[Serializer], model_labels: Iterable[str]) -> str:
+    """
+    Hash the declared fields of the serializer class and the fields of the
+    models without instantiating the serializer.
+    """
+
+    schema = {
+        "serializer": _describe_serializer_class(serializer_class, set()),
+        "models": {label: _describe_model(apps.get_model(label)) for label in model_labels},
+    }
+    return hashlib.sha1(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+def _describe_serializer_class(serializer_class: Type[Serializer], seen: Set[type]) -> Any:
+    if serializer_class in seen:
+        return serializer_class.__qualname__
+    seen = seen | {serializer_class}
+
+    meta = getattr(serializer_class, "Meta", None)
+    fields = {}
+    for name, field in getattr(serializer_class, "_declared_fields", {}).items():
+        nested = field.child if isinstance(field, ListSerializer) else field
+        fields[name] = [
+            type(field).__name__,
+            field.source,
+            getattr(field, "max_depth", None),
+            (
+                _describe_serializer_class(type(nested), seen)
+                if isinstance(nested, Serializer)
+                else None
+            ),
+        ]
+
+    return {
+        "fields": fields,
+        "meta": {
+            option: repr(getattr(meta, option, None))
+            for option in ("model", "fields", "exclude", "depth", *FIELD_TREE_META_OPTIONS)
+        },
+    }
+
+
+def _describe_model(model: Type[ModelType]) -> List[Any]:
+    return [
+        [
+            field.name,
+            type(field).__name__,
+            field.related_model._meta.label if field.related_model else None,  # noqa
+        ]
+        for field in model._meta.get_fields()  # noqa
+    ]
@@ -1,18 +1,39 @@
-from typing import List, Type
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
 
-from django.db.models import Prefetch, QuerySet
+from django.db.models import Model, Prefetch, Q, QuerySet, prefetch_related_objects
 from django.db.models.constants import LOOKUP_SEP
 from rest_framework.serializers import Serializer
 
+from drf_auto_query.batching import BatchedPrefetch, batch_prefetches, prefetch_in_batches
 from drf_auto_query.exceptions import QueryBuilderError
-from drf_auto_query.field_tree_builder import FieldNode, build_serializer_field_tree
-from drf_auto_query.types import ModelRelation
+from drf_auto_query.field_tree_builder import (
+    FieldNode,
+    build_serializer_field_tree,
+    get_serializer_field_tree,
+)
+from drf_auto_query.instrumentation import (
+    Instrumentation,
+    get_instrumentation,
+    instrument_queryset,
+)
+from drf_auto_query.reference_cache import (
+    ReferenceCache,
+    cache_relations,
+    set_cached_relation,
+)
+from drf_auto_query.types import ModelRelation, ModelType
 
 
 def prefetch_queryset_for_serializer(
     queryset: QuerySet,
     serializer_class: Type[Serializer],
     only_required_fields: bool = False,
+    instrumentation: Instrumentation = None,
+    prefetch_using: Union[str, Dict[str, str]] = None,
+    context: Dict[str, Any] = None,
+    serializer_kwargs: Dict[str, Any] = None,
+    prefetch_batch_size: int = None,
 ):
     """
     Given a serializer class and a queryset, join and select all the fields
@@ -23,21 +44,107 @@ def prefetch_queryset_for_serializer(
     :param queryset: Queryset that will be serialized.
     :param only_required_fields: If True, only the fields that are required to serialize the
       queryset will be selected in the query using the 'only' method of the queryset.
+    :param instrumentation: Receiver of the plan build and prefetch events. Defaults to the
+      instrumentation set with `set_instrumentation`.
+    :param prefetch_using: Database alias that the prefetch querysets should be sent to, or a
+      dictionary mapping prefetch lookups to database aliases. Prefetches that have no alias
+      set use the database of the queryset they are prefetched for.
+    :param context: Context the serializer will be instantiated with. Pass it for serializers
+      that change their fields based on the context, e.g. the user of the request.
+    :param serializer_kwargs: Other keyword arguments the serializer will be instantiated with,
+      for serializers that change their fields based on them.
+    :param prefetch_batch_size: Maximum number of objects a prefetch is executed for with a
+      single query. Nested serializers can set their own batch size with the
+      `prefetch_batch_size` option on their `Meta` class.
     """
 
-    serializer = serializer_class()
     query_builder = QueryBuilder(
         queryset=queryset,
         only_required_fields=only_required_fields,
+        instrumentation=instrumentation,
+        prefetch_using=prefetch_using,
+        prefetch_batch_size=prefetch_batch_size,
     )
-    return query_builder.get_queryset(serializer)
+    field_tree = get_serializer_field_tree(
+        serializer_class,
+        queryset.model,
+        instrumentation=query_builder.instrumentation,
+        context=context,
+        serializer_kwargs=serializer_kwargs,
+    )
+    return query_builder.get_queryset_for_field_tree(field_tree, serializer_class)
+
+
+def prefetch_instances_for_serializer(
+    instances: Iterable[Model],
+    serializer_class: Union[Type[Serializer], Dict[Type[ModelType], Type[Serializer]]],
+    instrumentation: Instrumentation = None,
+    prefetch_using: Union[str, Dict[str, str]] = None,
+    prefetch_batch_size: int = None,
+    context: Dict[str, Any] = None,
+    serializer_kwargs: Dict[str, Any] = None,
+):
+    """
+    Given a serializer class and model instances that were already loaded,
+    e.g. with `bulk_create` or from several querysets, prefetch all the
+    related models that are needed to serialize the instances.
+
+    Instances are grouped by model, so each group costs one query per
+    relation level.
+
+    :param instances: Model instances that will be serialized.
+    :param serializer_class: The serializer class that will be used to serialize the instances,
+      or a dictionary mapping models to the serializer classes of their instances.
+    :param instrumentation: Receiver of the plan build and prefetch events.
+    :param prefetch_using: Database alias that the prefetch querysets should be sent to, or a
+      dictionary mapping prefetch lookups to database aliases.
+    :param prefetch_batch_size: Maximum number of instances a prefetch is executed for with a
+      single query.
+    :param context: Context the serializer will be instantiated with, for serializers that
+      change their fields based on the context.
+    :param serializer_kwargs: Other keyword arguments the serializer will be instantiated with.
+    """
+
+    instances_by_model = defaultdict(list)
+    for instance in instances:
+        instances_by_model[type(instance)].append(instance)
+
+    for model, model_instances in instances_by_model.items():
+        model_serializer_class = (
+            serializer_class[model] if isinstance(serializer_class, dict) else serializer_class
+        )
+        query_builder = QueryBuilder(
+            queryset=model._default_manager.all(),  # noqa
+            instrumentation=instrumentation,
+            prefetch_using=prefetch_using,
+            prefetch_batch_size=prefetch_batch_size,
+        )
+        field_tree = get_serializer_field_tree(
+            model_serializer_class,
+            model,
+            instrumentation=query_builder.instrumentation,
+            context=context,
+            serializer_kwargs=serializer_kwargs,
+        )
+        query_builder.prefetch_instances(model_instances, field_tree, model_serializer_class)
 
 
 class QueryBuilder:
-    def __init__(self, queryset: QuerySet, only_required_fields: bool = False):
+    def __init__(
+        self,
+        queryset: QuerySet,
+        only_required_fields: bool = False,
+        instrumentation: Instrumentation = None,
+        prefetch_using: Union[str, Dict[str, str]] = None,
+        prefetch_batch_size: int = None,
+    ):
         self.queryset = queryset
         self.only_required_fields = only_required_fields
+        self.instrumentation = instrumentation or get_instrumentation()
+        self.prefetch_using = prefetch_using
+        self.prefetch_batch_size = prefetch_batch_size
         self.field_tree = None
+        self.serializer_class = None
 
     def get_queryset(self, serializer: Serializer):
         """
@@ -46,22 +153,97 @@ class QueryBuilder:
         given serializer instance.
         """
 
-        self.field_tree = build_serializer_field_tree(serializer, self.queryset.model)
+        field_tree = build_serializer_field_tree(serializer, self.queryset.model)
+        return self.get_queryset_for_field_tree(field_tree, type(serializer))
+
+    def get_queryset_for_field_tree(
+        self, field_tree: FieldNode, serializer_class: Type[Serializer] = None
+    ):
+        """
+        Same as `get_queryset`, but for an already built field tree of a serializer.
+        """
+
+        self.field_tree = field_tree
+        self.serializer_class = serializer_class
         return self._build_queryset_from_node(self.queryset, self.field_tree)
 
-    def _build_queryset_from_node(self, queryset: QuerySet, field_node: FieldNode):
+    def prefetch_instances(
+        self,
+        instances: List[ModelType],
+        field_tree: FieldNode,
+        serializer_class: Type[Serializer] = None,
+    ):
+        """
+        Prefetch everything needed to serialize already loaded instances of the
+        queryset model. To-one relations can not be joined to loaded instances,
+        so they are prefetched as well.
+        """
+
+        self.field_tree = field_tree
+        self.serializer_class = serializer_class
+
+        prefetch_objects = []
+        cached_relations = []
+        for child_node in field_tree.children:
+            relation = child_node.parent_relation
+            if relation == ModelRelation.NONE or relation == ModelRelation.FIELD:
+                continue
+
+            if relation == ModelRelation.RELATED_MODEL and not child_node.children:
+                # Only the primary key is needed, which the instances already have.
+                continue
+
+            if relation == ModelRelation.PARENT_LINK and not _has_nested_relations(child_node):
+                # Django builds the parent object from the inherited fields.
+                continue
+
+            if child_node.reference_cache:
+                cached_relations.append((child_node.source, child_node.reference_cache))
+                continue
+
+            prefetch_objects.append(
+                self._get_prefetch_object(
+                    child_node, child_node.source, "", None, parent_model=field_tree.model
+                )
+            )
+
+        prefetch_objects, batched_prefetches = _split_batched_prefetches(prefetch_objects)
+        prefetch_related_objects(instances, *prefetch_objects)
+        for prefetch in batched_prefetches:
+            prefetch_in_batches(instances, prefetch)
+        for lookup, reference_cache in cached_relations:
+            set_cached_relation(instances, lookup, reference_cache)
+
+    def _build_queryset_from_node(
+        self,
+        queryset: QuerySet,
+        field_node: FieldNode,
+        path: str = "",
+        using: Optional[str] = None,
+        required_fields: Sequence[str] = (),
+    ):
         selected_fields = _get_selected_fields(field_node)
         if self.only_required_fields:
-            queryset = queryset.only(*selected_fields)
+            queryset = queryset.only(*selected_fields, *required_fields)
 
         # Get all tables that should be joined to the queryset
         joined_tables = _get_select_related_args(selected_fields)
+        self.instrumentation.joins_selected(
+            self.serializer_class, path, queryset.model, joined_tables
+        )
         if joined_tables:
             queryset = queryset.select_related(*joined_tables)
 
-        prefetch_objects = self._get_prefetch_objects(field_node)
+        prefetch_objects = self._get_prefetch_objects(field_node, path=path, using=using)
+        prefetch_objects, batched_prefetches = _split_batched_prefetches(prefetch_objects)
         if prefetch_objects:
             queryset = queryset.prefetch_related(*prefetch_objects)
+        if batched_prefetches:
+            queryset = batch_prefetches(queryset, batched_prefetches)
+
+        cached_relations = _get_cached_relations(field_node)
+        if cached_relations:
+            queryset = cache_relations(queryset, cached_relations)
 
         return queryset
 
@@ -70,11 +252,21 @@ class QueryBuilder:
         return self.queryset.prefetch_related(*prefetch_objects)
 
     def _get_prefetch_objects(
-        self, field_node: FieldNode, related_name: str = ""
+        self,
+        field_node: FieldNode,
+        related_name: str = "",
+        path: str = "",
+        using: Optional[str] = None,
     ) -> List[Prefetch]:
         """
         Traverse the field tree and return a set of all the prefetch objects that
         should be used to prefetch the queryset.
+
+        :param related_name: Lookup of the field node relative to the queryset the
+          prefetch objects are for.
+        :param path: Lookup of the queryset the prefetch objects are for, relative
+          to the root queryset.
+        :param using: Database alias of the queryset the prefetch objects are for.
         """
 
         prefetch_objects = []
@@ -88,20 +280,89 @@ class QueryBuilder:
                 if related_name
                 else child_node.source
             )
+            if relation == ModelRelation.PARENT_LINK and not _has_nested_relations(child_node):
+                continue
+
             if child_node.parent_relation == ModelRelation.RELATED_MODEL:
-                child_prefetch_objects = self._get_prefetch_objects(child_node, lookup)
+                child_prefetch_objects = self._get_prefetch_objects(
+                    child_node, lookup, path=path, using=using
+                )
                 if child_prefetch_objects:
                     prefetch_objects.extend(child_prefetch_objects)
                 continue
 
-            queryset = self._get_prefetch_queryset(child_node, lookup)
-            if child_node.children:
-                queryset = self._build_queryset_from_node(queryset, child_node)
-
-            prefetch_objects.append(Prefetch(lookup, queryset=queryset))
+            prefetch_objects.append(
+                self._get_prefetch_object(
+                    child_node, lookup, path, using, parent_model=field_node.model
+                )
+            )
 
         return prefetch_objects
 
+    def _get_prefetch_object(
+        self,
+        field_node: FieldNode,
+        lookup: str,
+        path: str,
+        using: Optional[str],
+        parent_model: Type[ModelType] = None,
+    ) -> Prefetch:
+        """
+        Return the prefetch object for the relation of the field node, with a
+        queryset that selects and prefetches everything the node needs.
+
+        :param parent_model: Model that the relation of the field node is declared on.
+        """
+
+        full_lookup = f"{path}{LOOKUP_SEP}{lookup}" if path else lookup
+        using = self._get_prefetch_using(field_node, full_lookup, using)
+
+        queryset = self._get_prefetch_queryset(field_node, lookup)
+        if using and queryset._db is None:  # noqa
+            queryset = queryset.using(using)
+        if isinstance(field_node.prefetch_filter, Q):
+            queryset = queryset.filter(field_node.prefetch_filter)
+        elif field_node.prefetch_filter:
+            queryset = queryset.filter(**field_node.prefetch_filter)
+        if field_node.prefetch_ordering:
+            queryset = queryset.order_by(*field_node.prefetch_ordering)
+        if field_node.children:
+            queryset = self._build_queryset_from_node(
+                queryset,
+                field_node,
+                full_lookup,
+                using,
+                required_fields=_get_prefetch_related_fields(parent_model, field_node.source),
+            )
+        if self.instrumentation.enabled:
+            queryset = instrument_queryset(
+                queryset, self.instrumentation, self.serializer_class, full_lookup
+            )
+
+        batch_size = field_node.prefetch_batch_size or self.prefetch_batch_size
+        if batch_size:
+            return BatchedPrefetch(lookup, queryset=queryset, batch_size=batch_size)
+        return Prefetch(lookup, queryset=queryset)
+
+    def _get_prefetch_using(
+        self, field_node: FieldNode, lookup: str, parent_using: Optional[str]
+    ) -> Optional[str]:
+        """
+        Return the database alias the prefetch queryset for the given lookup should
+        be sent to. Aliases set for the lookup take precedence over the alias set on
+        the nested serializer, which takes precedence over the default alias. If no
+        alias is set, the alias of the parent prefetch is used.
+        """
+
+        if isinstance(self.prefetch_using, dict):
+            if lookup in self.prefetch_using:
+                return self.prefetch_using[lookup]
+            default_using = None
+        else:
+            default_using = self.prefetch_using
+
+        return field_node.using or default_using or parent_using
+
     def _get_prefetch_queryset(self, field_node: FieldNode, lookup: str) -> QuerySet:
         """
         Return the queryset instance that should be used for the `Prefetch` object.
@@ -123,7 +384,9 @@ class QueryBuilder:
             if prefetch.queryset and prefetch.prefetch_through == lookup:
                 return prefetch.queryset
 
-        return field_node.model.objects.all() if field_node.model else None
+        # The default manager is used like in Django's related managers, which
+        # also covers proxy models with a custom manager.
+        return field_node.model._default_manager.all()  # noqa
 
 
 def _get_selected_fields(field_node: FieldNode) -> List[str]:
@@ -144,8 +407,28 @@ def _get_selected_fields(field_node: FieldNode) -> List[str]:
             selected_fields.append(child_node.source)
             continue
 
+        if relation == ModelRelation.PARENT_LINK:
+            if _has_nested_relations(child_node):
+                # The parent object is prefetched, so only the link is selected.
+                selected_fields.append(child_node.source)
+            else:
+                # Django builds the parent object of a multi-table inheritance
+                # child from its inherited fields without a query if none of them
+                # are deferred, so they are selected instead of the parent table
+                # being joined again.
+                selected_fields.extend(
+                    field.name for field in child_node.model._meta.concrete_fields  # noqa
+                )
+            continue
+
         # This is a serializer field that corresponds to a model field that
         # represents a relation to another model.
+        if child_node.reference_cache:
+            # Related objects are taken from the reference cache, so only the
+            # foreign key is selected.
+            selected_fields.append(child_node.source)
+            continue
+
         pk_field_name = child_node.model._meta.pk.name  # noqa
         if not child_node.children:
             selected_fields.append(child_node.source + LOOKUP_SEP + pk_field_name)
@@ -159,6 +442,72 @@ def _get_selected_fields(field_node: FieldNode) -> List[str]:
     return selected_fields
 
 
+def _has_nested_relations(field_node: FieldNode) -> bool:
+    return any(
+        child_node.parent_relation not in (ModelRelation.NONE, ModelRelation.FIELD)
+        for child_node in field_node.children
+    )
+
+
+def _get_prefetch_related_fields(model: Optional[Type[ModelType]], source: str) -> List[str]:
+    """
+    Return the fields of the related model that Django needs to match the
+    prefetched objects of a relation to the objects they are prefetched for,
+    so they are not deferred by `only`.
+    """
+
+    if model is None:
+        return []
+
+    field = model._meta.get_field(source)  # noqa
+    if field.one_to_many and field.auto_created:
+        # Objects of a reverse foreign key are matched by the foreign key.
+        return [field.field.name]
+    return []
+
+
+def _split_batched_prefetches(
+    prefetch_objects: List[Prefetch],
+) -> Tuple[List[Prefetch], List[BatchedPrefetch]]:
+    """
+    Split the prefetch objects into the ones executed by `prefetch_related`
+    and the ones executed in batches.
+    """
+
+    batched_prefetches = [
+        prefetch for prefetch in prefetch_objects if isinstance(prefetch, BatchedPrefetch)
+    ]
+    prefetch_objects = [
+        prefetch for prefetch in prefetch_objects if not isinstance(prefetch, BatchedPrefetch)
+    ]
+    return prefetch_objects, batched_prefetches
+
+
+def _get_cached_relations(
+    field_node: FieldNode, related_name: str = ""
+) -> List[Tuple[str, ReferenceCache]]:
+    """
+    Traverse the to-one relations of the field tree and return the lookups and
+    reference caches of all the relations that are served from a reference cache.
+    """
+
+    cached_relations = []
+    for child_node in field_node.children:
+        if child_node.parent_relation != ModelRelation.RELATED_MODEL:
+            continue
+
+        lookup = (
+            f"{related_name}{LOOKUP_SEP}{child_node.source}" if related_name else child_node.source
+        )
+        if child_node.reference_cache:
+            cached_relations.append((lookup, child_node.reference_cache))
+            continue
+
+        cached_relations.extend(_get_cached_relations(child_node, lookup))
+
+    return cached_relations
+
+
 def _get_select_related_args(selected_fields: List[str]):
     """
     Parse all the related names from the selected fields and return a list of
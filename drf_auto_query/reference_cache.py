@@ -0,0 +1,256 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+from django.core.cache import caches
+from django.db.models import QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from drf_auto_query.exceptions import QueryBuilderError
+from drf_auto_query.types import ModelType
+from drf_auto_query.utils import wrap_iterable_class
+
+
+# Number of seconds objects stay in a reference cache by default. Objects that
+# were changed in other processes are served until they expire.
+DEFAULT_TIMEOUT = 300
+
+
+class ReferenceCache:
+    """
+    Shared cache of the rows of a small, rarely changing model, indexed by
+    primary key. Nested serializers that declare a reference cache with the
+    `reference_cache` option on their `Meta` class get their objects from
+    the cache instead of joining the table.
+
+    Cached objects are shared between requests and must be treated as
+    read-only. The cache is invalidated when objects of the model are saved,
+    deleted or their many-to-many relations change in the current process.
+    Changes made in other processes, e.g. other web server workers, and
+    changes made with `QuerySet.update`, `bulk_update`, `bulk_create` or raw
+    SQL do not send those signals, so such objects are served until they
+    expire. Use `cache_alias` with a cache shared by all the processes if
+    changes must be visible everywhere right away.
+
+    :param model: Model class whose rows are cached.
+    :param timeout: Number of seconds an object stays in the cache. None means forever and is
+      only allowed with `cache_alias`, because the in-process cache can not be invalidated
+      from other processes.
+    :param max_size: Maximum number of objects kept in the in-process cache. The
+      least recently used objects are evicted first.
+    :param cache_alias: Alias of a Django cache to store the objects in instead of the
+      process memory. The size of a Django cache is bound by its own configuration.
+    :param queryset: Queryset the cache misses are loaded from. Defaults to all the
+      objects of the model.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        timeout: float = DEFAULT_TIMEOUT,
+        max_size: int = 1000,
+        cache_alias: str = None,
+        queryset: QuerySet = None,
+    ):
+        if timeout is None and not cache_alias:
+            raise QueryBuilderError(
+                f"Reference cache of {model.__name__} needs a timeout when it is not "
+                "stored in a Django cache."
+            )
+
+        self.model = model
+        self.timeout = timeout
+        self.max_size = max_size
+        self.cache_alias = cache_alias
+        self.queryset = queryset
+
+        self.hits = 0
+        self.misses = 0
+
+        self._objects: "OrderedDict[Any, Tuple[float, ModelType]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        post_save.connect(self._on_change, dispatch_uid=self._dispatch_uid("post_save"))
+        post_delete.connect(self._on_change, dispatch_uid=self._dispatch_uid("post_delete"))
+        m2m_changed.connect(self._on_m2m_change, dispatch_uid=self._dispatch_uid("m2m_changed"))
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_many(self, pks: Iterable[Any]) -> Dict[Any, ModelType]:
+        """
+        Return a dictionary mapping the given primary keys to their objects.
+        Objects that are not cached are loaded with a single query.
+        """
+
+        pks = set(pks)
+        objects = self._get_cached(pks)
+        missing_pks = pks - objects.keys()
+
+        self.hits += len(objects)
+        self.misses += len(missing_pks)
+
+        if missing_pks:
+            queryset = self.queryset if self.queryset is not None else self.model._default_manager
+            loaded_objects = {obj.pk: obj for obj in queryset.filter(pk__in=missing_pks)}
+            self._set_cached(loaded_objects)
+            objects.update(loaded_objects)
+
+        return objects
+
+    def invalidate(self, pks: Iterable[Any] = None):
+        """
+        Remove the objects with the given primary keys from the cache, or all
+        the objects if no primary keys are given.
+        """
+
+        if self.cache_alias:
+            cache = caches[self.cache_alias]
+            if pks is not None:
+                cache.delete_many(list(self._get_cache_keys(pks)))
+                return
+
+            # A Django cache can not be cleared by key prefix, so the version
+            # that is part of all the keys is bumped instead.
+            try:
+                cache.incr(self._version_key())
+            except ValueError:
+                cache.set(self._version_key(), 2, None)
+            return
+
+        with self._lock:
+            if pks is None:
+                self._objects.clear()
+                return
+
+            for pk in pks:
+                self._objects.pop(pk, None)
+
+    def _get_cached(self, pks: Iterable[Any]) -> Dict[Any, ModelType]:
+        if self.cache_alias:
+            cache_keys = self._get_cache_keys(pks)
+            cached = caches[self.cache_alias].get_many(list(cache_keys))
+            return {cache_keys[cache_key]: obj for cache_key, obj in cached.items()}
+
+        now = monotonic()
+        objects = {}
+        with self._lock:
+            for pk in pks:
+                if pk not in self._objects:
+                    continue
+
+                expires_at, obj = self._objects[pk]
+                if expires_at < now:
+                    del self._objects[pk]
+                    continue
+
+                self._objects.move_to_end(pk)
+                objects[pk] = obj
+
+        return objects
+
+    def _set_cached(self, objects: Dict[Any, ModelType]):
+        if self.cache_alias:
+            cache_keys = self._get_cache_keys(objects)
+            caches[self.cache_alias].set_many(
+                {cache_key: objects[pk] for cache_key, pk in cache_keys.items()}, self.timeout
+            )
+            return
+
+        expires_at = monotonic() + self.timeout
+        with self._lock:
+            for pk, obj in objects.items():
+                self._objects[pk] = (expires_at, obj)
+                self._objects.move_to_end(pk)
+
+            while len(self._objects) > self.max_size:
+                self._objects.popitem(last=False)
+
+    def _get_cache_keys(self, pks: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Return a dictionary mapping the Django cache keys to the primary keys.
+        """
+
+        version = caches[self.cache_alias].get(self._version_key(), 1)
+        label = self.model._meta.label_lower  # noqa
+        return {f"drf_auto_query:{label}:{version}:{pk}": pk for pk in pks}
+
+    def _version_key(self) -> str:
+        return f"drf_auto_query:{self.model._meta.label_lower}:version"  # noqa
+
+    def _dispatch_uid(self, signal_name: str) -> str:
+        return f"drf_auto_query.reference_cache.{id(self)}.{signal_name}"
+
+    def _is_cached_model(self, model: Type[ModelType]) -> bool:
+        return model._meta.concrete_model is self.model._meta.concrete_model  # noqa
+
+    def _on_change(self, sender, instance, **kwargs):
+        if self._is_cached_model(sender):
+            self.invalidate([instance.pk])
+
+    def _on_m2m_change(self, sender, instance, action, model, pk_set, **kwargs):
+        if not action.startswith("post_"):
+            return
+
+        if self._is_cached_model(type(instance)):
+            self.invalidate([instance.pk])
+        if self._is_cached_model(model):
+            # The primary keys are not reported when the relation is cleared, in
+            # which case the whole cache is invalidated.
+            self.invalidate(pk_set)
+
+
+class _ReferenceCacheIterableMixin:
+    """
+    Mixin for the model iterable of a queryset that sets the related objects
+    of forward to-one relations from reference caches.
+    """
+
+    cached_relations: List[Tuple[str, ReferenceCache]]
+
+    def __iter__(self):
+        objects = list(super().__iter__())  # noqa
+        for lookup, reference_cache in self.cached_relations:
+            set_cached_relation(objects, lookup, reference_cache)
+
+        yield from objects
+
+
+def cache_relations(
+    queryset: QuerySet, cached_relations: List[Tuple[str, ReferenceCache]]
+) -> QuerySet:
+    """
+    Return a copy of the queryset that sets the related objects for the given
+    lookups from their reference caches after the objects are fetched.
+    """
+
+    return wrap_iterable_class(
+        queryset, _ReferenceCacheIterableMixin, cached_relations=cached_relations
+    )
+
+
+def set_cached_relation(objects: List[ModelType], lookup: str, reference_cache: ReferenceCache):
+    """
+    Set the related objects of a forward to-one relation from the reference
+    cache. The lookup may span relations that are already loaded.
+    """
+
+    *path, field_name = lookup.split(LOOKUP_SEP)
+    for related_name in path:
+        objects = [getattr(obj, related_name) for obj in objects]
+        objects = [obj for obj in objects if obj is not None]
+
+    if not objects:
+        return
+
+    field = objects[0]._meta.get_field(field_name)
+    related_pks = {getattr(obj, field.attname) for obj in objects} - {None}
+    related_objects = reference_cache.get_many(related_pks)
+    for obj in objects:
+        related_obj = related_objects.get(getattr(obj, field.attname))
+        if related_obj is not None:
+            field.set_cached_value(obj, related_obj)
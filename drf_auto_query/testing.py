@@ -0,0 +1,198 @@
+import difflib
+import inspect
+import json
+import os
+from contextlib import ExitStack
+from typing import Any, Dict, List, Set, Type
+
+from django.db import connections
+from django.db.models import Prefetch, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import Serializer
+
+from drf_auto_query.field_tree_builder import format_field_tree, get_serializer_field_tree
+from drf_auto_query.query_builder import prefetch_queryset_for_serializer
+
+
+UPDATE_SNAPSHOTS_ENV_VAR = "DRF_AUTO_QUERY_UPDATE_SNAPSHOTS"
+
+
+def describe_queryset_plan(queryset: QuerySet) -> Dict[str, Any]:
+    """
+    Return a JSON serializable description of the tables a queryset joins, the
+    columns it selects and the lookups it prefetches, including the plans of
+    the prefetch querysets.
+    """
+
+    selected_fields, is_deferred = queryset.query.deferred_loading
+    prefetches = {}
+    batched_prefetches = getattr(queryset._iterable_class, "batched_prefetches", [])  # noqa
+    for lookup in [*queryset._prefetch_related_lookups, *batched_prefetches]:  # noqa
+        if isinstance(lookup, Prefetch):
+            prefetches[lookup.prefetch_through] = (
+                describe_queryset_plan(lookup.queryset) if lookup.queryset is not None else {}
+            )
+        else:
+            prefetches[lookup] = {}
+
+    return {
+        "select_related": sorted(_get_select_related_lookups(queryset.query.select_related)),
+        "only": sorted(selected_fields) if not is_deferred else [],
+        "prefetch_related": prefetches,
+    }
+
+
+class AutoQueryTestCaseMixin:
+    """
+    Django `TestCase` mixin for catching serializer changes that add joins,
+    columns, prefetches or queries.
+
+    `assertSerializerPlan` compares the plan of the serializer and the number
+    of queries needed to serialize a batch of objects with a snapshot stored
+    in `snapshot_dir`. Snapshots are written when the
+    `DRF_AUTO_QUERY_UPDATE_SNAPSHOTS` environment variable is set. Otherwise
+    a missing snapshot fails the test, so a snapshot that was never committed
+    does not turn the test into a no-op.
+    """
+
+    # Defaults to a "snapshots" directory next to the test module.
+    snapshot_dir: str = None
+
+    def assertSerializerPlan(
+        self,
+        serializer_class: Type[Serializer],
+        queryset: QuerySet,
+        snapshot_name: str = None,
+        factory: Any = None,
+        num_of_objects: int = 10,
+        **kwargs,
+    ):
+        """
+        Fail if the plan of the serializer or the number of queries needed to
+        serialize the queryset grew compared to the snapshot.
+
+        :param serializer_class: Serializer class that is checked.
+        :param queryset: Queryset the serializer is used with.
+        :param snapshot_name: Name of the snapshot file. Defaults to the name of the test.
+        :param factory: Factory with a `create_batch` method, e.g. a factory_boy factory, that
+          creates the objects that are serialized to count the queries.
+        :param num_of_objects: Number of objects created with the factory.
+        :param kwargs: Keyword arguments passed to `prefetch_queryset_for_serializer`.
+        """
+
+        queryset = prefetch_queryset_for_serializer(queryset, serializer_class, **kwargs)
+        field_tree = get_serializer_field_tree(
+            serializer_class,
+            queryset.model,
+            context=kwargs.get("context"),
+            serializer_kwargs=kwargs.get("serializer_kwargs"),
+        )
+        snapshot = {
+            "plan": describe_queryset_plan(queryset),
+            "field_tree": format_field_tree(field_tree),
+        }
+        if factory is not None:
+            factory.create_batch(num_of_objects)
+            snapshot["num_of_objects"] = num_of_objects
+            snapshot["num_of_queries"] = _count_serializer_queries(
+                serializer_class(
+                    queryset.all(),
+                    many=True,
+                    context=kwargs.get("context") or {},
+                    **(kwargs.get("serializer_kwargs") or {}),
+                )
+            )
+
+        snapshot_path = self._get_snapshot_path(snapshot_name or self._testMethodName)  # noqa
+        if os.environ.get(UPDATE_SNAPSHOTS_ENV_VAR):
+            _write_snapshot(snapshot_path, snapshot)
+            return
+        if not os.path.exists(snapshot_path):
+            self.fail(  # noqa
+                f"Snapshot {snapshot_path} does not exist. Run the tests with the "
+                f"{UPDATE_SNAPSHOTS_ENV_VAR} environment variable set to write it."
+            )
+
+        with open(snapshot_path) as snapshot_file:
+            expected_snapshot = json.load(snapshot_file)
+
+        errors = []
+        added_entries = _flatten_plan(snapshot["plan"]) - _flatten_plan(expected_snapshot["plan"])
+        if added_entries:
+            errors.append(
+                "Plan grew by:\n" + "\n".join(f"  {entry}" for entry in sorted(added_entries))
+            )
+
+        num_of_queries = snapshot.get("num_of_queries")
+        expected_num_of_queries = expected_snapshot.get("num_of_queries")
+        if (
+            num_of_queries is not None
+            and expected_num_of_queries is not None
+            and num_of_queries > expected_num_of_queries
+        ):
+            errors.append(
+                f"Serializing {num_of_objects} objects took {num_of_queries} queries "
+                f"instead of {expected_num_of_queries}."
+            )
+
+        if errors:
+            field_tree_diff = difflib.unified_diff(
+                expected_snapshot["field_tree"],
+                snapshot["field_tree"],
+                fromfile="snapshot",
+                tofile="current",
+                lineterm="",
+            )
+            errors.append("Field tree diff:\n" + "\n".join(field_tree_diff))
+            self.fail(f"{serializer_class.__name__} regressed:\n\n" + "\n\n".join(errors))  # noqa
+
+    def _get_snapshot_path(self, snapshot_name: str) -> str:
+        snapshot_dir = self.snapshot_dir or os.path.join(
+            os.path.dirname(inspect.getfile(type(self))), "snapshots"
+        )
+        return os.path.join(snapshot_dir, f"{type(self).__name__}.{snapshot_name}.json")
+
+
+def _get_select_related_lookups(select_related: Any, related_name: str = "") -> List[str]:
+    if not isinstance(select_related, dict):
+        return []
+
+    lookups = []
+    for name, nested_select_related in select_related.items():
+        lookup = f"{related_name}{LOOKUP_SEP}{name}" if related_name else name
+        lookups.append(lookup)
+        lookups.extend(_get_select_related_lookups(nested_select_related, lookup))
+
+    return lookups
+
+
+def _flatten_plan(plan: Dict[str, Any], path: str = "") -> Set[str]:
+    prefix = f"{path}: " if path else ""
+    entries = {f"{prefix}select_related {lookup}" for lookup in plan.get("select_related", [])}
+    entries.update(f"{prefix}only {field}" for field in plan.get("only", []))
+    for lookup, prefetch_plan in plan.get("prefetch_related", {}).items():
+        prefetch_path = f"{path}{LOOKUP_SEP}{lookup}" if path else lookup
+        entries.add(f"{prefix}prefetch_related {lookup}")
+        entries.update(_flatten_plan(prefetch_plan, prefetch_path))
+
+    return entries
+
+
+def _count_serializer_queries(serializer: Serializer) -> int:
+    # Prefetches can be routed to other databases, so the queries are
+    # captured on every connection.
+    with ExitStack() as stack:
+        contexts = [
+            stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections
+        ]
+        serializer.data  # noqa
+
+    return sum(len(context.captured_queries) for context in contexts)
+
+
+def _write_snapshot(snapshot_path: str, snapshot: Dict[str, Any]):
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    with open(snapshot_path, "w") as snapshot_file:
+        json.dump(snapshot, snapshot_file, indent=2, sort_keys=True)
+        snapshot_file.write("\n")
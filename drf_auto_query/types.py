@@ -16,4 +16,6 @@ class ModelRelation(enum.Enum):
     FIELD = "field"
     RELATED_MODEL = "related_model"
     MANY_RELATED_MODEL = "many_related_model"
+    # One-to-one link from a multi-table inheritance child to its parent model.
+    PARENT_LINK = "parent_link"
     NONE = "none"
@@ -1,11 +1,18 @@
-from typing import List
+from typing import Any, List
 
+from django.db.models import QuerySet
 from rest_framework.serializers import Serializer
 
+from drf_auto_query.fields import RecursiveField
 from drf_auto_query.types import ModelType, SerializerField
 
 
 def get_serializer_fields(serializer: Serializer) -> List[SerializerField]:
+    if isinstance(serializer, RecursiveField):
+        if serializer.is_exhausted:
+            return []
+        serializer = serializer.get_serializer()
+
     base_serializer = _get_base_serializer(serializer)
     if not hasattr(base_serializer, "fields"):
         return []
@@ -13,6 +20,16 @@ def get_serializer_fields(serializer: Serializer) -> List[SerializerField]:
     return list(getattr(base_serializer, "fields", {}).values())
 
 
+def get_serializer_meta_option(serializer: SerializerField, name: str, default: Any = None) -> Any:
+    """
+    Return an option declared on the `Meta` class of a serializer, or the
+    default if the serializer does not declare it.
+    """
+
+    meta = getattr(_get_base_serializer(serializer), "Meta", None)
+    return getattr(meta, name, default)
+
+
 def _get_base_serializer(serializer: Serializer) -> Serializer:
     """
     Return the serializer class that contains declared fields to
@@ -23,3 +40,20 @@ def _get_base_serializer(serializer: Serializer) -> Serializer:
         return serializer.child
 
     return serializer
+
+
+def wrap_iterable_class(queryset: QuerySet, mixin: type, **attrs: Any) -> QuerySet:
+    """
+    Return a copy of the queryset whose iterable class is extended with the
+    given mixin. The keyword arguments are set as attributes of the new
+    iterable class.
+    """
+
+    queryset = queryset.all()
+    iterable_class = queryset._iterable_class  # noqa
+    queryset._iterable_class = type(
+        f"{mixin.__name__.strip('_')}{iterable_class.__name__}",
+        (mixin, iterable_class),
+        attrs,
+    )
+    return queryset
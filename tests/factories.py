@@ -1,7 +1,7 @@
 import factory
 from factory.django import DjangoModelFactory
 
-from tests.models import Author, Book, Publisher, TwinBrotherAuthor
+from tests.models import Author, Book, Category, Publisher, Restaurant, TwinBrotherAuthor
 
 
 class AuthorFactory(DjangoModelFactory):
@@ -34,3 +34,19 @@ class TwinBrotherAuthorFactory(DjangoModelFactory):
 
     class Meta:
         model = TwinBrotherAuthor
+
+
+class CategoryFactory(DjangoModelFactory):
+    name = factory.Faker("word")
+
+    class Meta:
+        model = Category
+
+
+class RestaurantFactory(DjangoModelFactory):
+    name = factory.Faker("company")
+    address = factory.Faker("address")
+    serves_pizza = factory.Faker("pybool")
+
+    class Meta:
+        model = Restaurant
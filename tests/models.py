@@ -44,3 +44,26 @@ class TwinSisterAuthor(models.Model):
     description = models.TextField()
     author = models.OneToOneField(Author, on_delete=models.CASCADE, related_name="twin_sister")
     publisher_friends = models.ManyToManyField("Publisher", related_name="twin_sister_friends")
+
+
+class Category(models.Model):
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, related_name="children", null=True)
+
+
+class Place(models.Model):
+    name = models.CharField(max_length=255)
+    address = models.CharField(max_length=255)
+    owner = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name="places", null=True)
+
+
+class Restaurant(Place):
+    serves_pizza = models.BooleanField(default=False)
+    chef = models.ForeignKey(
+        Author, on_delete=models.CASCADE, related_name="restaurants", null=True
+    )
+
+
+class ProxyRestaurant(Restaurant):
+    class Meta:
+        proxy = True
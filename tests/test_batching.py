@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_instances_for_serializer, prefetch_queryset_for_serializer
+from drf_auto_query.exceptions import QueryBuilderError
+from drf_auto_query.testing import describe_queryset_plan
+from tests.factories import AuthorFactory, BookFactory
+from tests.models import Author
+from tests.utils import test_serializer, test_serializer_class
+
+
+def author_serializer_class(**meta):
+    return test_serializer_class(
+        name="AuthorSerializer",
+        fields={
+            "name": serializers.CharField(),
+            "books": test_serializer(
+                fields={
+                    "title": serializers.CharField(),
+                    "Meta": type("Meta", (), meta),
+                },
+                many=True,
+            ),
+        },
+    )
+
+
+class BatchedPrefetchTestCase(TestCase):
+    def setUp(self) -> None:
+        self.authors = AuthorFactory.create_batch(5)
+        for author in self.authors:
+            BookFactory.create_batch(2, author=author)
+
+    def test_prefetch_batch_size_option(self):
+        # Arrange
+        serializer_class = author_serializer_class(prefetch_batch_size=2)
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(Author.objects.order_by("pk"), serializer_class)
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(4):
+            # 1 query for the authors
+            # 3 queries for the books of 2, 2 and 1 authors
+            data = serializer.data
+        self.assertEqual([len(author["books"]) for author in data], [2, 2, 2, 2, 2])
+        self.assertIn("books", describe_queryset_plan(queryset)["prefetch_related"])
+
+    def test_default_prefetch_batch_size(self):
+        # Arrange
+        serializer_class = author_serializer_class()
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), serializer_class, prefetch_batch_size=3
+        )
+
+        # Assert
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(queryset)), 5)
+
+    def test_batch_size_is_limited_by_query_params(self):
+        # Arrange
+        serializer_class = author_serializer_class(prefetch_batch_size=100)
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
+
+        # Act & Assert
+        with mock.patch.object(connection.features, "max_query_params", 2):
+            with self.assertNumQueries(4):
+                list(queryset)
+
+    def test_prefetch_instances_in_batches(self):
+        # Arrange
+        serializer_class = author_serializer_class(prefetch_batch_size=2)
+        instances = list(Author.objects.all())
+
+        # Act
+        with self.assertNumQueries(3):
+            prefetch_instances_for_serializer(instances, serializer_class)
+
+        # Assert
+        with self.assertNumQueries(0):
+            data = serializer_class(instances, many=True).data
+        self.assertEqual(len(data[0]["books"]), 2)
+
+    def test_batch_size_on_to_one_relation(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "favourite_book": test_serializer(
+                    fields={
+                        "title": serializers.CharField(),
+                        "Meta": type("Meta", (), {"prefetch_batch_size": 2}),
+                    },
+                ),
+            },
+        )
+
+        # Act & Assert
+        with self.assertRaises(QueryBuilderError):
+            prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
@@ -1,11 +1,15 @@
 from django.test import TestCase
 from rest_framework import serializers
 
-from drf_auto_query.field_tree_builder import FieldNode, build_serializer_field_tree
+from drf_auto_query.field_tree_builder import (
+    FieldNode,
+    build_serializer_field_tree,
+    get_serializer_field_tree,
+)
 from drf_auto_query.types import ModelRelation
 from tests.factories import AuthorFactory, BookFactory, PublisherFactory
-from tests.models import Author, Book
-from tests.utils import test_serializer
+from tests.models import Author, Book, Place, ProxyRestaurant, Restaurant
+from tests.utils import test_serializer, test_serializer_class
 
 
 class BuildSerializerFieldTreeTestCase(TestCase):
@@ -122,3 +126,118 @@ class BuildSerializerFieldTreeTestCase(TestCase):
         self.assertEqual(child_node.field_name, "publisher_friends")
         self.assertEqual(child_node.parent_relation, ModelRelation.MANY_RELATED_MODEL)
         self.assertEqual(len(child_node.children), 1)
+
+
+class MultiTableInheritanceFieldTreeTestCase(TestCase):
+    def test_inherited_fields(self):
+        # Arrange
+        serializer = test_serializer(
+            fields={
+                "id": serializers.IntegerField(),
+                "name": serializers.CharField(),
+                "serves_pizza": serializers.BooleanField(),
+            }
+        )
+
+        # Act
+        field_tree = build_serializer_field_tree(serializer, Restaurant)
+
+        # Assert
+        self.assertEqual(
+            [child_node.parent_relation for child_node in field_tree.children],
+            [ModelRelation.FIELD, ModelRelation.FIELD, ModelRelation.FIELD],
+        )
+
+    def test_parent_link(self):
+        # Arrange
+        serializer = test_serializer(
+            fields={
+                "place_ptr": test_serializer(fields={"address": serializers.CharField()}),
+            }
+        )
+
+        # Act
+        field_tree = build_serializer_field_tree(serializer, ProxyRestaurant)
+
+        # Assert
+        child_node = field_tree.children[0]
+        self.assertEqual(child_node.parent_relation, ModelRelation.PARENT_LINK)
+        self.assertEqual(child_node.children[0].parent_relation, ModelRelation.FIELD)
+
+    def test_child_accessor(self):
+        # Arrange
+        serializer = test_serializer(
+            fields={
+                "restaurant": test_serializer(fields={"serves_pizza": serializers.BooleanField()}),
+            }
+        )
+
+        # Act
+        field_tree = build_serializer_field_tree(serializer, Place)
+
+        # Assert
+        child_node = field_tree.children[0]
+        self.assertEqual(child_node.parent_relation, ModelRelation.RELATED_MODEL)
+        self.assertEqual(child_node.model, Restaurant)
+
+
+class RoleAuthorSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    favourite_book = test_serializer(fields={"title": serializers.CharField()})
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get("role") != "admin":
+            self.fields.pop("favourite_book")
+
+
+class GetSerializerFieldTreeTestCase(TestCase):
+    def test_field_tree_is_cached_per_model(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="NameSerializer",
+            fields={
+                "name": serializers.CharField(),
+            },
+        )
+
+        # Act
+        author_field_tree = get_serializer_field_tree(serializer_class, Author)
+        cached_field_tree = get_serializer_field_tree(serializer_class, Author)
+        book_field_tree = get_serializer_field_tree(serializer_class, Book)
+
+        # Assert
+        self.assertIs(author_field_tree, cached_field_tree)
+        self.assertIsNot(author_field_tree, book_field_tree)
+        self.assertEqual(book_field_tree.children[0].parent_relation, ModelRelation.NONE)
+
+    def test_field_tree_is_built_with_context(self):
+        # Act
+        admin_field_tree = get_serializer_field_tree(
+            RoleAuthorSerializer, Author, context={"role": "admin"}
+        )
+        user_field_tree = get_serializer_field_tree(
+            RoleAuthorSerializer, Author, context={"role": "user"}
+        )
+
+        # Assert
+        self.assertEqual(
+            [child_node.field_name for child_node in admin_field_tree.children],
+            ["name", "favourite_book"],
+        )
+        self.assertEqual(
+            [child_node.field_name for child_node in user_field_tree.children], ["name"]
+        )
+
+    def test_field_tree_is_cached_per_fingerprint(self):
+        # Act
+        user_field_tree = get_serializer_field_tree(
+            RoleAuthorSerializer, Author, context={"role": "user"}
+        )
+        guest_field_tree = get_serializer_field_tree(
+            RoleAuthorSerializer, Author, context={"role": "guest"}
+        )
+
+        # Assert
+        self.assertIs(user_field_tree, guest_field_tree)
+        self.assertIsNone(user_field_tree.serializer_field)
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_queryset_for_serializer
+from drf_auto_query.field_tree_builder import build_serializer_field_tree
+from drf_auto_query.fields import RecursiveField
+from drf_auto_query.types import ModelRelation
+from tests.factories import CategoryFactory
+from tests.models import Category
+
+
+class CategorySerializer(serializers.Serializer):
+    name = serializers.CharField()
+    children = RecursiveField(many=True, max_depth=2)
+
+
+class ParentCategorySerializer(serializers.Serializer):
+    name = serializers.CharField()
+    parent = RecursiveField(max_depth=3)
+
+
+class RecursiveFieldTestCase(TestCase):
+    def setUp(self) -> None:
+        self.roots = CategoryFactory.create_batch(2)
+        for root in self.roots:
+            for child in CategoryFactory.create_batch(2, parent=root):
+                for grandchild in CategoryFactory.create_batch(2, parent=child):
+                    CategoryFactory.create(parent=grandchild)
+
+    def test_field_tree_depth(self):
+        # Act
+        field_tree = build_serializer_field_tree(CategorySerializer(), Category)
+
+        # Assert
+        children_node = field_tree.children[1]
+        self.assertEqual(children_node.parent_relation, ModelRelation.MANY_RELATED_MODEL)
+
+        grandchildren_node = children_node.children[1]
+        self.assertEqual(grandchildren_node.parent_relation, ModelRelation.MANY_RELATED_MODEL)
+
+        exhausted_node = grandchildren_node.children[1]
+        self.assertEqual(exhausted_node.parent_relation, ModelRelation.NONE)
+
+    def test_num_of_queries_depends_on_depth(self):
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Category.objects.filter(parent=None), CategorySerializer
+        )
+
+        # Assert
+        serializer = CategorySerializer(queryset, many=True)
+        with self.assertNumQueries(3):
+            # 1 query for the roots
+            # 1 query per level of the tree
+            data = serializer.data
+
+        self.assertEqual(len(data), 2)
+        self.assertEqual(len(data[0]["children"]), 2)
+        self.assertEqual(len(data[0]["children"][0]["children"]), 2)
+        self.assertEqual(data[0]["children"][0]["children"][0]["children"], [])
+
+    def test_to_one_relation_is_joined(self):
+        # Arrange
+        leaf = Category.objects.filter(children=None).first()
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Category.objects.filter(pk=leaf.pk), ParentCategorySerializer
+        )
+
+        # Assert
+        serializer = ParentCategorySerializer(queryset, many=True)
+        with self.assertNumQueries(1):
+            data = serializer.data
+        self.assertIsNone(data[0]["parent"]["parent"]["parent"]["parent"])
+
+    def test_serializer_is_built_once_per_level(self):
+        # Arrange
+        queryset = prefetch_queryset_for_serializer(
+            Category.objects.filter(parent=None), CategorySerializer
+        )
+        serializer = CategorySerializer(queryset, many=True)
+
+        # Act
+        with mock.patch.object(
+            CategorySerializer,
+            "__init__",
+            autospec=True,
+            side_effect=serializers.Serializer.__init__,
+        ) as init:
+            serializer.data  # noqa
+
+        # Assert
+        # One serializer for each of the two nested levels and one for the
+        # empty lists of the exhausted level.
+        self.assertEqual(init.call_count, 3)
@@ -0,0 +1,138 @@
+from unittest.mock import MagicMock
+
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query.instrumentation import (
+    Instrumentation,
+    LoggingInstrumentation,
+    NullInstrumentation,
+    StatsdInstrumentation,
+    get_instrumentation,
+    set_instrumentation,
+)
+from drf_auto_query.query_builder import prefetch_queryset_for_serializer
+from tests.factories import AuthorFactory, BookFactory, PublisherFactory
+from tests.models import Author
+from tests.utils import test_serializer, test_serializer_class
+
+
+class RecordingInstrumentation(Instrumentation):
+    def __init__(self):
+        self.events = []
+
+    def plan_build_finished(self, serializer_class, model, duration, cache_hit):
+        self.events.append(("plan", serializer_class.__name__, cache_hit))
+
+    def joins_selected(self, serializer_class, lookup, model, joined_tables):
+        self.events.append(("joins", lookup, joined_tables))
+
+    def prefetch_executed(self, serializer_class, lookup, model, row_count, duration):
+        self.events.append(("prefetch", lookup, row_count))
+
+
+def author_serializer_class():
+    return test_serializer_class(
+        name="AuthorSerializer",
+        fields={
+            "name": serializers.CharField(),
+            "books": test_serializer(
+                many=True,
+                fields={
+                    "title": serializers.CharField(),
+                    "publisher": test_serializer(
+                        fields={
+                            "first_name": serializers.CharField(),
+                        },
+                    ),
+                },
+            ),
+        },
+    )
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self) -> None:
+        for author in AuthorFactory.create_batch(2):
+            BookFactory.create_batch(3, author=author, publisher=PublisherFactory.create())
+
+    def test_plan_build_cache_hit_and_miss(self):
+        # Arrange
+        instrumentation = RecordingInstrumentation()
+        serializer_class = author_serializer_class()
+
+        # Act
+        for _ in range(2):
+            prefetch_queryset_for_serializer(
+                Author.objects.all(), serializer_class, instrumentation=instrumentation
+            )
+
+        # Assert
+        plan_events = [event for event in instrumentation.events if event[0] == "plan"]
+        self.assertEqual(
+            plan_events,
+            [("plan", "AuthorSerializer", False), ("plan", "AuthorSerializer", True)],
+        )
+
+    def test_prefetch_row_count_and_join_width(self):
+        # Arrange
+        instrumentation = RecordingInstrumentation()
+        serializer_class = author_serializer_class()
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), serializer_class, instrumentation=instrumentation
+        )
+        list(queryset)
+
+        # Assert
+        self.assertIn(("joins", "books", ["publisher"]), instrumentation.events)
+        self.assertIn(("prefetch", "books", 6), instrumentation.events)
+
+    def test_instrumentation_does_not_change_num_of_queries(self):
+        # Arrange
+        serializer_class = author_serializer_class()
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(),
+            serializer_class,
+            instrumentation=LoggingInstrumentation(),
+        )
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(2):
+            self.assertIsNotNone(serializer.data)
+
+    def test_statsd_instrumentation(self):
+        # Arrange
+        client = MagicMock()
+        serializer_class = author_serializer_class()
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(),
+            serializer_class,
+            instrumentation=StatsdInstrumentation(client, prefix="api"),
+        )
+        list(queryset)
+
+        # Assert
+        client.incr.assert_called_once_with("api.plan.AuthorSerializer.cache_miss")
+        client.gauge.assert_any_call("api.prefetch.AuthorSerializer.books.rows", 6)
+
+    def test_set_instrumentation(self):
+        # Arrange
+        instrumentation = RecordingInstrumentation()
+
+        # Act
+        set_instrumentation(instrumentation)
+        try:
+            prefetch_queryset_for_serializer(Author.objects.all(), author_serializer_class())
+        finally:
+            set_instrumentation(None)
+
+        # Assert
+        self.assertTrue(instrumentation.events)
+        self.assertIsInstance(get_instrumentation(), NullInstrumentation)
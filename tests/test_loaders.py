@@ -0,0 +1,224 @@
+from django.db.models import Count
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_queryset_for_serializer
+from drf_auto_query.fields import RecursiveField
+from drf_auto_query.loaders import BatchLoader, BatchLoaderMixin, ModelBatchLoader
+from tests.factories import AuthorFactory, BookFactory, CategoryFactory, PublisherFactory
+from tests.models import Author, Book, Category, Publisher
+
+
+class BookCountLoader(BatchLoader):
+    def load_batch(self, keys):
+        book_counts = (
+            Book.objects.filter(author_id__in=keys)
+            .values("author_id")
+            .annotate(count=Count("id"))
+            .values_list("author_id", "count")
+        )
+        return dict(book_counts)
+
+
+class AuthorSerializer(BatchLoaderMixin, serializers.ModelSerializer):
+    batch_loaders = {"book_count": BookCountLoader}
+    book_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Author
+        fields = ["name", "book_count"]
+
+    def register_book_count(self, author):
+        self.get_loader("book_count").register(author.pk)
+
+    def get_book_count(self, author):
+        return self.get_loader("book_count").load(author.pk, default=0)
+
+
+class BookSerializer(serializers.ModelSerializer):
+    author = AuthorSerializer()
+
+    class Meta:
+        model = Book
+        fields = ["title", "author"]
+
+
+class PublisherSerializer(serializers.ModelSerializer):
+    books = BookSerializer(many=True)
+
+    class Meta:
+        model = Publisher
+        fields = ["first_name", "books"]
+
+
+class BookCountSerializer(BatchLoaderMixin, serializers.ModelSerializer):
+    batch_loaders = {"author_book_count": BookCountLoader}
+    author_book_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Book
+        fields = ["title", "author_book_count"]
+
+    def register_author_book_count(self, book):
+        self.get_loader("author_book_count").register(book.author_id)
+
+    def get_author_book_count(self, book):
+        return self.get_loader("author_book_count").load(book.author_id, default=0)
+
+
+class AuthorBooksSerializer(serializers.ModelSerializer):
+    books = BookCountSerializer(many=True)
+
+    class Meta:
+        model = Author
+        fields = ["name", "books"]
+
+
+class ChildCountLoader(BatchLoader):
+    def load_batch(self, keys):
+        child_counts = (
+            Category.objects.filter(parent_id__in=keys)
+            .values("parent_id")
+            .annotate(count=Count("id"))
+            .values_list("parent_id", "count")
+        )
+        return dict(child_counts)
+
+
+class CategoryTreeSerializer(BatchLoaderMixin, serializers.Serializer):
+    batch_loaders = {"child_count": ChildCountLoader}
+    name = serializers.CharField()
+    child_count = serializers.SerializerMethodField()
+    children = RecursiveField(many=True, max_depth=2)
+
+    def register_child_count(self, category):
+        self.get_loader("child_count").register(category.pk)
+
+    def get_child_count(self, category):
+        return self.get_loader("child_count").load(category.pk, default=0)
+
+
+class BatchLoaderTestCase(TestCase):
+    def test_keys_are_loaded_once(self):
+        # Arrange
+        loader = ModelBatchLoader(Author.objects.all())
+        authors = AuthorFactory.create_batch(3)
+        for author in authors:
+            loader.register(author.pk)
+
+        # Act
+        with self.assertNumQueries(1):
+            loaded_authors = [loader.load(author.pk) for author in authors]
+        missing_author = loader.load(-1, default="missing")
+
+        # Assert
+        self.assertEqual(loaded_authors, authors)
+        self.assertEqual(missing_author, "missing")
+        self.assertEqual(loader.batch_count, 2)
+
+    def test_model_batch_loader_many(self):
+        # Arrange
+        author = AuthorFactory.create()
+        books = BookFactory.create_batch(2, author=author)
+        loader = ModelBatchLoader(Book.objects.order_by("id"), field_name="author", many=True)
+
+        # Act
+        loaded_books = loader.load(author.pk)
+
+        # Assert
+        self.assertEqual(loaded_books, books)
+
+
+class BatchLoaderMixinTestCase(TestCase):
+    def setUp(self) -> None:
+        self.authors = AuthorFactory.create_batch(3)
+        for author in self.authors:
+            BookFactory.create_batch(2, author=author)
+
+    def test_num_of_queries_for_list(self):
+        # Act
+        serializer = AuthorSerializer(Author.objects.all(), many=True)
+
+        # Assert
+        with self.assertNumQueries(2):
+            # 1 query for the authors
+            # 1 query for the book counts
+            data = serializer.data
+        self.assertEqual([author["book_count"] for author in data], [2, 2, 2])
+
+    def test_single_instance(self):
+        # Act
+        serializer = AuthorSerializer(self.authors[0])
+
+        # Assert
+        with self.assertNumQueries(1):
+            self.assertEqual(serializer.data["book_count"], 2)
+
+    def test_nested_serializers_register_keys(self):
+        # Arrange
+        publisher = PublisherFactory.create()
+        Book.objects.update(publisher=publisher)
+        queryset = prefetch_queryset_for_serializer(Publisher.objects.all(), PublisherSerializer)
+
+        # Act
+        serializer = PublisherSerializer(queryset, many=True)
+
+        # Assert
+        with self.assertNumQueries(3):
+            # 1 query for the publishers
+            # 1 query for the books and their authors
+            # 1 query for the book counts
+            data = serializer.data
+        self.assertEqual(len(data[0]["books"]), 6)
+
+    def test_nested_list_under_plain_root(self):
+        # Arrange
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), AuthorBooksSerializer)
+
+        # Act
+        serializer = AuthorBooksSerializer(queryset, many=True)
+
+        # Assert
+        with self.assertNumQueries(3):
+            # 1 query for the authors
+            # 1 query for the books
+            # 1 query for the book counts
+            data = serializer.data
+        self.assertEqual(
+            [book["author_book_count"] for author in data for book in author["books"]],
+            [2] * 6,
+        )
+
+    def test_nested_list_under_plain_root_instance(self):
+        # Arrange
+        author = Author.objects.prefetch_related("books").get(pk=self.authors[0].pk)
+
+        # Act
+        serializer = AuthorBooksSerializer(author)
+
+        # Assert
+        with self.assertNumQueries(1):
+            data = serializer.data
+        self.assertEqual([book["author_book_count"] for book in data["books"]], [2, 2])
+
+    def test_recursive_field(self):
+        # Arrange
+        for root in CategoryFactory.create_batch(3):
+            for child in CategoryFactory.create_batch(3, parent=root):
+                CategoryFactory.create_batch(3, parent=child)
+        queryset = prefetch_queryset_for_serializer(
+            Category.objects.filter(parent=None), CategoryTreeSerializer
+        )
+
+        # Act
+        serializer = CategoryTreeSerializer(queryset, many=True)
+
+        # Assert
+        with self.assertNumQueries(4):
+            # 1 query for the roots
+            # 1 query per nested level of the tree
+            # 1 query for the child counts of all the levels
+            data = serializer.data
+        self.assertEqual(data[0]["child_count"], 3)
+        self.assertEqual(data[0]["children"][0]["child_count"], 3)
+        self.assertEqual(data[0]["children"][0]["children"][0]["child_count"], 0)
@@ -0,0 +1,97 @@
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_queryset_for_serializer
+from drf_auto_query.fields import RecursiveField
+from drf_auto_query.memoization import MemoizedRepresentationMixin, RepresentationMemo
+from tests.factories import AuthorFactory, BookFactory, CategoryFactory, PublisherFactory
+from tests.models import Book
+
+
+class PublisherSerializer(MemoizedRepresentationMixin, serializers.Serializer):
+    first_name = serializers.CharField()
+    serialized_count = serializers.SerializerMethodField()
+
+    calls = 0
+
+    def get_serialized_count(self, publisher):
+        PublisherSerializer.calls += 1
+        return PublisherSerializer.calls
+
+
+class BookSerializer(serializers.Serializer):
+    title = serializers.CharField()
+    publisher = PublisherSerializer()
+
+
+class CategoryAncestorsSerializer(MemoizedRepresentationMixin, serializers.Serializer):
+    name = serializers.CharField()
+    parent = RecursiveField(max_depth=1)
+
+
+class MemoizedRepresentationMixinTestCase(TestCase):
+    def setUp(self) -> None:
+        PublisherSerializer.calls = 0
+        author = AuthorFactory.create()
+        self.publishers = PublisherFactory.create_batch(2)
+        for publisher in self.publishers:
+            BookFactory.create_batch(3, author=author, publisher=publisher)
+
+    def test_repeated_objects_are_serialized_once(self):
+        # Arrange
+        queryset = prefetch_queryset_for_serializer(Book.objects.order_by("pk"), BookSerializer)
+
+        # Act
+        serializer = BookSerializer(queryset, many=True)
+        data = serializer.data
+
+        # Assert
+        self.assertEqual(PublisherSerializer.calls, 2)
+        self.assertEqual(
+            [book["publisher"]["first_name"] for book in data],
+            [publisher.first_name for publisher in self.publishers for _ in range(3)],
+        )
+
+        memo = serializer.child.fields["publisher"].get_representation_memo()
+        self.assertEqual((memo.hits, memo.misses), (4, 2))
+
+    def test_memo_is_not_shared_between_serializations(self):
+        # Act
+        BookSerializer(Book.objects.all(), many=True).data  # noqa
+        BookSerializer(Book.objects.all(), many=True).data  # noqa
+
+        # Assert
+        self.assertEqual(PublisherSerializer.calls, 4)
+
+    def test_levels_of_recursive_field_are_memoized_separately(self):
+        # Arrange
+        root = CategoryFactory.create()
+        child = CategoryFactory.create(parent=root)
+        grandchild = CategoryFactory.create(parent=child)
+
+        # Act
+        data = CategoryAncestorsSerializer([grandchild, child], many=True).data
+
+        # Assert
+        self.assertEqual(data[0]["parent"], {"name": child.name, "parent": None})
+        self.assertEqual(
+            data[1], {"name": child.name, "parent": {"name": root.name, "parent": None}}
+        )
+
+
+class RepresentationMemoTestCase(TestCase):
+    def test_least_recently_used_representations_are_evicted(self):
+        # Arrange
+        memo = RepresentationMemo(max_size=2)
+        memo.set("a", {"id": 1})
+        memo.set("b", {"id": 2})
+
+        # Act
+        memo.get("a")
+        memo.set("c", {"id": 3})
+
+        # Assert
+        self.assertEqual(len(memo), 2)
+        self.assertEqual(memo.get("a"), {"id": 1})
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual(memo.hit_rate, 2 / 3)
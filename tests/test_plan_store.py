@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query.field_tree_builder import (
+    _field_tree_cache,
+    build_serializer_field_tree,
+    format_field_tree,
+)
+from drf_auto_query.plan_store import PLAN_FORMAT_VERSION, PlanStore, set_plan_store
+from drf_auto_query.query_builder import prefetch_queryset_for_serializer
+from drf_auto_query.reference_cache import ReferenceCache
+from tests.factories import AuthorFactory, BookFactory
+from tests.models import Author, Book, Publisher
+
+
+class PublisherSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Publisher
+        fields = ["first_name"]
+        prefetch_using = "default"
+
+
+class BookSerializer(serializers.ModelSerializer):
+    publisher = PublisherSerializer()
+
+    class Meta:
+        model = Book
+        fields = ["title", "publisher"]
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    books = BookSerializer(many=True)
+
+    class Meta:
+        model = Author
+        fields = ["name", "books"]
+
+
+class CachedPublisherSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Publisher
+        fields = ["first_name"]
+        reference_cache = ReferenceCache(Publisher)
+
+
+class CachedBookSerializer(serializers.ModelSerializer):
+    publisher = CachedPublisherSerializer()
+
+    class Meta:
+        model = Book
+        fields = ["title", "publisher"]
+
+
+class PlanStoreTestCase(TestCase):
+    def setUp(self) -> None:
+        plan_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(plan_dir.cleanup)
+        self.path = os.path.join(plan_dir.name, "plans.json")
+
+    def test_stored_field_tree_matches_built_field_tree(self):
+        # Arrange
+        PlanStore(self.path).write([AuthorSerializer, (BookSerializer, Book)])
+
+        # Act
+        field_tree = PlanStore(self.path).get(AuthorSerializer, Author)
+
+        # Assert
+        self.assertEqual(
+            format_field_tree(field_tree),
+            format_field_tree(build_serializer_field_tree(AuthorSerializer(), Author)),
+        )
+        self.assertEqual(field_tree.children[1].children[1].using, "default")
+
+    def test_missing_and_stale_plans(self):
+        # Arrange
+        plan_store = PlanStore(self.path)
+        plan_store.write([BookSerializer])
+
+        # Act
+        BookSerializer._declared_fields["author"] = serializers.CharField()
+        try:
+            stale_field_tree = plan_store.get(BookSerializer, Book)
+        finally:
+            del BookSerializer._declared_fields["author"]
+
+        # Assert
+        self.assertIsNone(stale_field_tree)
+        self.assertIsNone(plan_store.get(AuthorSerializer, Author))
+        self.assertIsNotNone(plan_store.get(BookSerializer, Book))
+
+    def test_plans_go_stale_when_prefetch_filter_or_ordering_is_added(self):
+        # Arrange
+        plan_store = PlanStore(self.path)
+        plan_store.write([AuthorSerializer])
+
+        for option, value in [
+            ("prefetch_filter", {"num_of_pages__gt": 100}),
+            ("prefetch_ordering", ["-num_of_pages"]),
+        ]:
+            with self.subTest(option=option):
+                # Act
+                setattr(BookSerializer.Meta, option, value)
+                try:
+                    field_tree = plan_store.get(AuthorSerializer, Author)
+                finally:
+                    delattr(BookSerializer.Meta, option)
+
+                # Assert
+                self.assertIsNone(field_tree)
+                self.assertIsNotNone(plan_store.get(AuthorSerializer, Author))
+
+    def test_plans_go_stale_when_reference_cache_is_added(self):
+        # Arrange
+        plan_store = PlanStore(self.path)
+        plan_store.write([BookSerializer])
+
+        # Act
+        PublisherSerializer.Meta.reference_cache = ReferenceCache(Publisher)
+        try:
+            field_tree = plan_store.get(BookSerializer, Book)
+        finally:
+            del PublisherSerializer.Meta.reference_cache
+
+        # Assert
+        self.assertIsNone(field_tree)
+
+    def test_plans_with_reference_caches_are_not_stored(self):
+        # Act
+        plan_store = PlanStore(self.path)
+        plan_store.write([CachedBookSerializer])
+
+        # Assert
+        self.assertIsNone(plan_store.get(CachedBookSerializer, Book))
+
+    def test_missing_file(self):
+        # Act
+        field_tree = PlanStore(self.path).get(AuthorSerializer, Author)
+
+        # Assert
+        self.assertIsNone(field_tree)
+
+    def test_file_is_readable_by_other_users(self):
+        # Act
+        PlanStore(self.path).write([AuthorSerializer])
+
+        # Assert
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+
+    def test_unreadable_file_and_other_version_are_logged(self):
+        for content in ["not json", json.dumps({"version": PLAN_FORMAT_VERSION - 1})]:
+            with self.subTest(content=content):
+                # Arrange
+                with open(self.path, "w") as plan_file:
+                    plan_file.write(content)
+
+                # Act
+                with self.assertLogs("drf_auto_query", level="WARNING"):
+                    field_tree = PlanStore(self.path).get(AuthorSerializer, Author)
+
+                # Assert
+                self.assertIsNone(field_tree)
+
+    def test_prefetch_with_stored_plan(self):
+        # Arrange
+        for author in AuthorFactory.create_batch(2):
+            BookFactory.create_batch(2, author=author)
+
+        PlanStore(self.path).write([AuthorSerializer])
+        _field_tree_cache.pop(AuthorSerializer, None)
+        set_plan_store(PlanStore(self.path))
+        self.addCleanup(set_plan_store, None)
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), AuthorSerializer)
+
+        # Assert
+        self.assertIsNone(_field_tree_cache[AuthorSerializer][Author].serializer_field)
+        serializer = AuthorSerializer(queryset, many=True)
+        with self.assertNumQueries(2):
+            self.assertIsNotNone(serializer.data)
@@ -1,18 +1,33 @@
 from unittest.mock import MagicMock
 
-from django.db.models import Prefetch, Value
+from django.db.models import Prefetch, Q, Value
 from django.test import TestCase
 from rest_framework import serializers
 
+from drf_auto_query.exceptions import QueryBuilderError
 from drf_auto_query.field_tree_builder import FieldNode
 from drf_auto_query.query_builder import (
     QueryBuilder,
     _get_selected_fields,
+    prefetch_instances_for_serializer,
     prefetch_queryset_for_serializer,
 )
 from drf_auto_query.types import ModelRelation
-from tests.factories import AuthorFactory, BookFactory, PublisherFactory, TwinBrotherAuthorFactory
-from tests.models import Author, Book, Publisher, TwinSisterAuthor
+from tests.factories import (
+    AuthorFactory,
+    BookFactory,
+    PublisherFactory,
+    RestaurantFactory,
+    TwinBrotherAuthorFactory,
+)
+from tests.models import (
+    Author,
+    Book,
+    ProxyRestaurant,
+    Publisher,
+    Restaurant,
+    TwinSisterAuthor,
+)
 from tests.utils import author_field_node, test_serializer, test_serializer_class
 
 
@@ -244,6 +259,107 @@ class QueryBuilderGetPrefetchObjectsTestCase(TestCase):
         self.assertEqual(prefetch_objects[0].prefetch_through, "twin_sister__publisher_friends")
 
 
+class QueryBuilderPrefetchUsingTestCase(TestCase):
+    def books_field_node(self, using=None):
+        parent_node = author_field_node()
+        child_node = FieldNode(
+            field_name="books",
+            source="books",
+            serializer_field=MagicMock(),
+            parent_relation=ModelRelation.MANY_RELATED_MODEL,
+            model=Book,
+            using=using,
+        )
+        grandchild_node = FieldNode(
+            field_name="author",
+            source="author",
+            serializer_field=MagicMock(),
+            parent_relation=ModelRelation.RELATED_MODEL,
+            model=Author,
+        )
+        great_grandchild_node = FieldNode(
+            field_name="publisher_friends",
+            source="publisher_friends",
+            serializer_field=MagicMock(),
+            parent_relation=ModelRelation.MANY_RELATED_MODEL,
+            model=Publisher,
+        )
+        parent_node.children.append(child_node)
+        child_node.children.append(grandchild_node)
+        grandchild_node.children.append(great_grandchild_node)
+        return parent_node
+
+    def get_prefetch_querysets(self, prefetch_objects):
+        books_queryset = prefetch_objects[0].queryset
+        nested_queryset = books_queryset._prefetch_related_lookups[0].queryset
+        return books_queryset, nested_queryset
+
+    def test_prefetch_queryset_is_not_routed_by_default(self):
+        # Arrange
+        parent_node = self.books_field_node()
+
+        # Act
+        queryset = Author.objects.using("default")
+        prefetch_objects = QueryBuilder(queryset)._get_prefetch_objects(parent_node)
+
+        # Assert
+        books_queryset, nested_queryset = self.get_prefetch_querysets(prefetch_objects)
+        self.assertIsNone(books_queryset._db)
+        self.assertIsNone(nested_queryset._db)
+
+    def test_default_alias_is_inherited_by_nested_prefetches(self):
+        # Arrange
+        parent_node = self.books_field_node()
+
+        # Act
+        queryset = Author.objects.all()
+        prefetch_objects = QueryBuilder(queryset, prefetch_using="replica")._get_prefetch_objects(
+            parent_node
+        )
+
+        # Assert
+        books_queryset, nested_queryset = self.get_prefetch_querysets(prefetch_objects)
+        self.assertEqual(books_queryset.db, "replica")
+        self.assertEqual(nested_queryset.db, "replica")
+
+    def test_alias_per_lookup(self):
+        # Arrange
+        parent_node = self.books_field_node(using="replica")
+
+        # Act
+        queryset = Author.objects.all()
+        query_builder = QueryBuilder(
+            queryset, prefetch_using={"books__author__publisher_friends": "other"}
+        )
+        prefetch_objects = query_builder._get_prefetch_objects(parent_node)
+
+        # Assert
+        books_queryset, nested_queryset = self.get_prefetch_querysets(prefetch_objects)
+        self.assertEqual(books_queryset.db, "replica")
+        self.assertEqual(nested_queryset.db, "other")
+
+    def test_alias_from_serializer_meta(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "books": test_serializer(
+                    fields={
+                        "title": serializers.CharField(),
+                        "Meta": type("Meta", (), {"prefetch_using": "replica"}),
+                    },
+                    many=True,
+                )
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
+
+        # Assert
+        self.assertEqual(queryset._prefetch_related_lookups[0].queryset.db, "replica")
+
+
 class PrefetchQuerysetForSerializerTestCase(TestCase):
     def setUp(self) -> None:
         self.authors = AuthorFactory.create_batch(2)
@@ -298,3 +414,297 @@ class PrefetchQuerysetForSerializerTestCase(TestCase):
         serializer = serializer_class(queryset, many=True)
         with self.assertNumQueries(1):
             self.assertIsNotNone(serializer.data)
+
+    def test_serializer_context(self):
+        # Arrange
+        class AuthorSerializer(serializers.Serializer):
+            name = serializers.CharField()
+            books = test_serializer(fields={"title": serializers.CharField()}, many=True)
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if not self.context.get("show_books"):
+                    self.fields.pop("books")
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), AuthorSerializer, context={"show_books": False}
+        )
+        books_queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), AuthorSerializer, context={"show_books": True}
+        )
+
+        # Assert
+        self.assertEqual(queryset._prefetch_related_lookups, ())
+        self.assertEqual(
+            [prefetch.prefetch_to for prefetch in books_queryset._prefetch_related_lookups],
+            ["books"],
+        )
+
+
+class PrefetchInstancesForSerializerTestCase(TestCase):
+    def setUp(self) -> None:
+        self.authors = AuthorFactory.create_batch(2)
+        for author in self.authors:
+            books = BookFactory.create_batch(2, author=author, publisher=PublisherFactory.create())
+            author.favourite_book = books[0]
+            author.save()
+            TwinBrotherAuthorFactory.create(author=author)
+
+    def test_num_of_queries_for_loaded_instances(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "name": serializers.CharField(),
+                "books": test_serializer(
+                    fields={
+                        "title": serializers.CharField(),
+                        "publisher": test_serializer(
+                            fields={"first_name": serializers.CharField()},
+                        ),
+                    },
+                    many=True,
+                ),
+                "favourite_book": test_serializer(
+                    fields={"title": serializers.CharField()},
+                ),
+                "twin_brother": test_serializer(
+                    fields={"name": serializers.CharField()},
+                ),
+            },
+        )
+        authors = list(Author.objects.all())
+
+        # Act
+        with self.assertNumQueries(3):
+            # 1 query for the books and their publishers
+            # 1 query for the favourite books
+            # 1 query for the twin brothers
+            prefetch_instances_for_serializer(authors, serializer_class)
+
+        # Assert
+        serializer = serializer_class(authors, many=True)
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(serializer.data)
+
+    def test_mixed_models(self):
+        # Arrange
+        author_serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "books": test_serializer(fields={"title": serializers.CharField()}, many=True),
+            },
+        )
+        book_serializer_class = test_serializer_class(
+            name="BookSerializer",
+            fields={
+                "publisher": test_serializer(fields={"first_name": serializers.CharField()}),
+            },
+        )
+        instances = [*Book.objects.all(), *Author.objects.all()]
+
+        # Act
+        with self.assertNumQueries(2):
+            # 1 query for the publishers of the books
+            # 1 query for the books of the authors
+            prefetch_instances_for_serializer(
+                instances, {Author: author_serializer_class, Book: book_serializer_class}
+            )
+
+        # Assert
+        with self.assertNumQueries(0):
+            for instance in instances:
+                serializer_class = (
+                    author_serializer_class
+                    if isinstance(instance, Author)
+                    else book_serializer_class
+                )
+                self.assertIsNotNone(serializer_class(instance).data)
+
+    def test_serializer_context(self):
+        # Arrange
+        class AuthorSerializer(serializers.Serializer):
+            name = serializers.CharField()
+            books = test_serializer(fields={"title": serializers.CharField()}, many=True)
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if not self.context.get("show_books"):
+                    self.fields.pop("books")
+
+        authors = list(Author.objects.all())
+
+        # Act & Assert
+        with self.assertNumQueries(0):
+            prefetch_instances_for_serializer(
+                authors, AuthorSerializer, context={"show_books": False}
+            )
+        with self.assertNumQueries(1):
+            prefetch_instances_for_serializer(
+                authors, AuthorSerializer, context={"show_books": True}
+            )
+
+
+class PrefetchFilterTestCase(TestCase):
+    def setUp(self) -> None:
+        self.author = AuthorFactory.create()
+        for num_of_pages in [300, 50, 200]:
+            BookFactory.create(author=self.author, num_of_pages=num_of_pages)
+
+    def test_filter_and_ordering(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "books": test_serializer(
+                    fields={
+                        "num_of_pages": serializers.IntegerField(),
+                        "Meta": type(
+                            "Meta",
+                            (),
+                            {
+                                "prefetch_filter": Q(num_of_pages__gte=100),
+                                "prefetch_ordering": ["num_of_pages"],
+                            },
+                        ),
+                    },
+                    many=True,
+                ),
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(2):
+            data = serializer.data
+        self.assertEqual(
+            [book["num_of_pages"] for book in data[0]["books"]],
+            [200, 300],
+        )
+
+    def test_filter_as_dictionary(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "books": test_serializer(
+                    fields={
+                        "num_of_pages": serializers.IntegerField(),
+                        "Meta": type("Meta", (), {"prefetch_filter": {"num_of_pages__lt": 100}}),
+                    },
+                    many=True,
+                ),
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
+
+        # Assert
+        data = serializer_class(queryset, many=True).data
+        self.assertEqual(data[0]["books"], [{"num_of_pages": 50}])
+
+    def test_filter_on_to_one_relation(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "favourite_book": test_serializer(
+                    fields={
+                        "title": serializers.CharField(),
+                        "Meta": type("Meta", (), {"prefetch_filter": {"num_of_pages__lt": 100}}),
+                    },
+                ),
+            },
+        )
+
+        # Act & Assert
+        with self.assertRaises(QueryBuilderError):
+            prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
+
+
+class MultiTableInheritanceTestCase(TestCase):
+    def setUp(self) -> None:
+        self.chef = AuthorFactory.create()
+        self.owner = PublisherFactory.create()
+        RestaurantFactory.create_batch(3, chef=self.chef, owner=self.owner)
+
+    def test_inherited_fields_and_parent_link(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="RestaurantSerializer",
+            fields={
+                "id": serializers.IntegerField(),
+                "name": serializers.CharField(),
+                "serves_pizza": serializers.BooleanField(),
+                "place_ptr": test_serializer(fields={"address": serializers.CharField()}),
+            },
+        )
+
+        for model in [Restaurant, ProxyRestaurant]:
+            with self.subTest(model=model):
+                # Act
+                queryset = prefetch_queryset_for_serializer(
+                    model.objects.all(), serializer_class, only_required_fields=True
+                )
+
+                # Assert
+                serializer = serializer_class(queryset, many=True)
+                with self.assertNumQueries(1):
+                    data = serializer.data
+                self.assertEqual(len(data), 3)
+
+    def test_parent_link_with_nested_relation(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="RestaurantSerializer",
+            fields={
+                "place_ptr": test_serializer(
+                    fields={
+                        "address": serializers.CharField(),
+                        "owner": test_serializer(fields={"first_name": serializers.CharField()}),
+                    }
+                ),
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Restaurant.objects.all(), serializer_class, only_required_fields=True
+        )
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(2):
+            data = serializer.data
+        self.assertEqual(data[0]["place_ptr"]["owner"]["first_name"], self.owner.first_name)
+
+    def test_reverse_relation_to_child_model(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "restaurants": test_serializer(
+                    fields={
+                        "name": serializers.CharField(),
+                        "owner": test_serializer(fields={"first_name": serializers.CharField()}),
+                    },
+                    many=True,
+                ),
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), serializer_class, only_required_fields=True
+        )
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(2):
+            data = serializer.data
+        self.assertEqual(len(data[0]["restaurants"]), 3)
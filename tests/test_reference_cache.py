@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_queryset_for_serializer
+from drf_auto_query.exceptions import QueryBuilderError
+from drf_auto_query.reference_cache import ReferenceCache
+from tests.factories import AuthorFactory, BookFactory, PublisherFactory
+from tests.models import Author, Book, Publisher
+from tests.utils import test_serializer, test_serializer_class
+
+
+def book_serializer_class(reference_cache):
+    return test_serializer_class(
+        name="BookSerializer",
+        fields={
+            "title": serializers.CharField(),
+            "publisher": test_serializer(
+                fields={
+                    "first_name": serializers.CharField(),
+                    "Meta": type("Meta", (), {"reference_cache": reference_cache}),
+                },
+            ),
+        },
+    )
+
+
+class ReferenceCacheTestCase(TestCase):
+    def setUp(self) -> None:
+        self.publishers = PublisherFactory.create_batch(2)
+        for publisher in self.publishers:
+            BookFactory.create_batch(3, publisher=publisher)
+
+    def serialize_books(self, serializer_class, num_of_queries):
+        queryset = prefetch_queryset_for_serializer(Book.objects.order_by("id"), serializer_class)
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(num_of_queries):
+            return serializer.data
+
+    def test_related_objects_are_cached(self):
+        # Arrange
+        reference_cache = ReferenceCache(Publisher)
+        serializer_class = book_serializer_class(reference_cache)
+
+        # Act
+        # 1 query for the books
+        # 1 query for the publishers that are not cached yet
+        self.serialize_books(serializer_class, 2)
+        data = self.serialize_books(serializer_class, 1)
+
+        # Assert
+        self.assertEqual(data[0]["publisher"]["first_name"], self.publishers[0].first_name)
+        self.assertEqual(reference_cache.misses, 2)
+        self.assertEqual(reference_cache.hits, 2)
+        self.assertEqual(reference_cache.hit_rate, 0.5)
+
+    def test_cache_is_invalidated_on_save(self):
+        # Arrange
+        reference_cache = ReferenceCache(Publisher)
+        serializer_class = book_serializer_class(reference_cache)
+        self.serialize_books(serializer_class, 2)
+
+        # Act
+        self.publishers[0].first_name = "Changed"
+        self.publishers[0].save()
+        data = self.serialize_books(serializer_class, 2)
+
+        # Assert
+        self.assertEqual(data[0]["publisher"]["first_name"], "Changed")
+        self.assertEqual(reference_cache.misses, 3)
+
+    def test_cache_is_invalidated_on_delete(self):
+        # Arrange
+        reference_cache = ReferenceCache(Publisher)
+        pks = [publisher.pk for publisher in self.publishers]
+        reference_cache.get_many(pks)
+
+        # Act
+        self.publishers[0].delete()
+
+        # Assert
+        with self.assertNumQueries(1):
+            reference_cache.get_many(pks)
+
+    def test_cache_is_invalidated_on_m2m_change(self):
+        # Arrange
+        reference_cache = ReferenceCache(Publisher)
+        reference_cache.get_many([self.publishers[0].pk])
+
+        # Act
+        AuthorFactory.create().publisher_friends.add(self.publishers[0])
+
+        # Assert
+        with self.assertNumQueries(1):
+            reference_cache.get_many([self.publishers[0].pk])
+
+    def test_max_size_and_timeout(self):
+        # Arrange
+        bounded_cache = ReferenceCache(Publisher, max_size=1)
+        expiring_cache = ReferenceCache(Publisher, timeout=-1)
+        pks = [publisher.pk for publisher in self.publishers]
+
+        # Act
+        bounded_cache.get_many(pks)
+        expiring_cache.get_many(pks)
+
+        # Assert
+        with self.assertNumQueries(1):
+            bounded_cache.get_many(pks)
+        with self.assertNumQueries(1):
+            expiring_cache.get_many(pks)
+
+    def test_in_process_cache_needs_timeout(self):
+        # Act & Assert
+        with self.assertRaises(QueryBuilderError):
+            ReferenceCache(Publisher, timeout=None)
+        ReferenceCache(Publisher, timeout=None, cache_alias="default")
+
+    def test_django_cache_backend(self):
+        # Arrange
+        self.addCleanup(cache.clear)
+        reference_cache = ReferenceCache(Publisher, cache_alias="default")
+        serializer_class = book_serializer_class(reference_cache)
+        self.serialize_books(serializer_class, 2)
+        self.serialize_books(serializer_class, 1)
+
+        # Act
+        reference_cache.invalidate()
+
+        # Assert
+        self.serialize_books(serializer_class, 2)
+
+    def test_nested_to_one_relation(self):
+        # Arrange
+        reference_cache = ReferenceCache(Publisher)
+        reference_cache.get_many([publisher.pk for publisher in self.publishers])
+        AuthorFactory.create(favourite_book=Book.objects.first())
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "favourite_book": book_serializer_class(reference_cache)(),
+            },
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), serializer_class, only_required_fields=True
+        )
+
+        # Assert
+        serializer = serializer_class(queryset, many=True)
+        with self.assertNumQueries(1):
+            data = serializer.data
+        self.assertEqual(
+            data[0]["favourite_book"]["publisher"]["first_name"], self.publishers[0].first_name
+        )
+
+    def test_to_many_relation_is_not_supported(self):
+        # Arrange
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "books": test_serializer(
+                    fields={
+                        "title": serializers.CharField(),
+                        "Meta": type("Meta", (), {"reference_cache": ReferenceCache(Book)}),
+                    },
+                    many=True,
+                ),
+            },
+        )
+
+        # Act & Assert
+        with self.assertRaises(QueryBuilderError):
+            prefetch_queryset_for_serializer(Author.objects.all(), serializer_class)
@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework import serializers
+
+from drf_auto_query import prefetch_queryset_for_serializer
+from drf_auto_query.testing import (
+    UPDATE_SNAPSHOTS_ENV_VAR,
+    AutoQueryTestCaseMixin,
+    describe_queryset_plan,
+)
+from tests.factories import AuthorFactory
+from tests.models import Author
+from tests.utils import test_serializer, test_serializer_class
+
+
+def author_serializer_class(book_fields):
+    return test_serializer_class(
+        name="AuthorSerializer",
+        fields={
+            "name": serializers.CharField(),
+            "books": test_serializer(fields=book_fields, many=True),
+        },
+    )
+
+
+class DescribeQuerysetPlanTestCase(TestCase):
+    def test_nested_plan(self):
+        # Arrange
+        serializer_class = author_serializer_class(
+            {
+                "title": serializers.CharField(),
+                "publisher": test_serializer(fields={"first_name": serializers.CharField()}),
+            }
+        )
+
+        # Act
+        queryset = prefetch_queryset_for_serializer(
+            Author.objects.all(), serializer_class, only_required_fields=True
+        )
+        plan = describe_queryset_plan(queryset)
+
+        # Assert
+        self.assertEqual(plan["only"], ["name"])
+        self.assertEqual(plan["select_related"], [])
+        self.assertEqual(
+            plan["prefetch_related"]["books"],
+            {
+                "select_related": ["publisher"],
+                "only": ["author", "publisher__first_name", "title"],
+                "prefetch_related": {},
+            },
+        )
+
+
+class AutoQueryTestCaseMixinTestCase(AutoQueryTestCaseMixin, TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self) -> None:
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        self.snapshot_dir = snapshot_dir.name
+
+    def update_snapshots(self):
+        return mock.patch.dict(os.environ, {UPDATE_SNAPSHOTS_ENV_VAR: "1"})
+
+    def test_snapshot_is_written_and_matched(self):
+        # Arrange
+        serializer_class = author_serializer_class({"title": serializers.CharField()})
+
+        # Act
+        with self.update_snapshots():
+            self.assertSerializerPlan(serializer_class, Author.objects.all(), factory=AuthorFactory)
+        self.assertSerializerPlan(serializer_class, Author.objects.all(), factory=AuthorFactory)
+
+        # Assert
+        with open(self._get_snapshot_path("test_snapshot_is_written_and_matched")) as file:
+            snapshot = json.load(file)
+        self.assertEqual(snapshot["num_of_queries"], 2)
+        self.assertIn("books", snapshot["plan"]["prefetch_related"])
+
+    def test_queries_on_other_databases_are_counted(self):
+        # Arrange
+        serializer_class = author_serializer_class({"title": serializers.CharField()})
+
+        # Act
+        with self.update_snapshots():
+            self.assertSerializerPlan(
+                serializer_class,
+                Author.objects.all(),
+                factory=AuthorFactory,
+                prefetch_using="replica",
+            )
+
+        # Assert
+        with open(self._get_snapshot_path("test_queries_on_other_databases_are_counted")) as file:
+            snapshot = json.load(file)
+        self.assertEqual(snapshot["num_of_queries"], 2)
+
+    def test_missing_snapshot_fails(self):
+        # Arrange
+        serializer_class = author_serializer_class({"title": serializers.CharField()})
+
+        # Act
+        with mock.patch.dict(os.environ), self.assertRaises(AssertionError) as context:
+            os.environ.pop(UPDATE_SNAPSHOTS_ENV_VAR, None)
+            self.assertSerializerPlan(serializer_class, Author.objects.all())
+
+        # Assert
+        self.assertIn("does not exist", str(context.exception))
+        self.assertFalse(os.path.exists(self._get_snapshot_path("test_missing_snapshot_fails")))
+
+    def test_grown_plan_fails(self):
+        # Arrange
+        with self.update_snapshots():
+            self.assertSerializerPlan(
+                author_serializer_class({"title": serializers.CharField()}),
+                Author.objects.all(),
+                snapshot_name="author",
+            )
+        serializer_class = author_serializer_class(
+            {
+                "title": serializers.CharField(),
+                "publisher": test_serializer(fields={"first_name": serializers.CharField()}),
+            }
+        )
+
+        # Act
+        with self.assertRaises(AssertionError) as context:
+            self.assertSerializerPlan(
+                serializer_class, Author.objects.all(), snapshot_name="author"
+            )
+
+        # Assert
+        message = str(context.exception)
+        self.assertIn("books: select_related publisher", message)
+        self.assertIn("+        publisher [related_model Publisher]", message)
+
+    def test_more_queries_fail(self):
+        # Arrange
+        serializer_class = author_serializer_class({"title": serializers.CharField()})
+        with self.update_snapshots():
+            self.assertSerializerPlan(serializer_class, Author.objects.all(), factory=AuthorFactory)
+
+        snapshot_path = self._get_snapshot_path("test_more_queries_fail")
+        with open(snapshot_path) as file:
+            snapshot = json.load(file)
+        snapshot["num_of_queries"] = 1
+        with open(snapshot_path, "w") as file:
+            json.dump(snapshot, file)
+
+        # Act
+        with self.assertRaises(AssertionError) as context:
+            self.assertSerializerPlan(serializer_class, Author.objects.all(), factory=AuthorFactory)
+
+        # Assert
+        self.assertIn("took 2 queries instead of 1", str(context.exception))
+
+    def test_update_snapshots(self):
+        # Arrange
+        with self.update_snapshots():
+            self.assertSerializerPlan(
+                author_serializer_class({"title": serializers.CharField()}),
+                Author.objects.all(),
+            )
+        serializer_class = test_serializer_class(
+            name="AuthorSerializer",
+            fields={
+                "name": serializers.CharField(),
+                "favourite_book": test_serializer(fields={"title": serializers.CharField()}),
+            },
+        )
+
+        # Act
+        with self.update_snapshots():
+            self.assertSerializerPlan(serializer_class, Author.objects.all())
+
+        # Assert
+        self.assertSerializerPlan(serializer_class, Author.objects.all())